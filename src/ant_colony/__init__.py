@@ -1,3 +1,82 @@
-from .aco_tsp import *
-from .aco_tsp_oo import *
-from .optim_hyper import *
\ No newline at end of file
+import importlib
+
+# nombre público -> submódulo que lo define. Los submódulos se importan hasta
+# que se usa alguno de sus nombres (PEP 562), de modo que importar el paquete
+# no carga numpy, matplotlib, folium, networkx ni optuna.
+_LAZY = {
+    'ant_colony': 'aco_tsp',
+    'hormiga_recorre': 'aco_tsp',
+    'Progress': 'aco_tsp_oo',
+    'ant': 'aco_tsp_oo',
+    'colony': 'aco_tsp_oo',
+    'colony_multiw': 'aco_tsp_oo',
+    'Solution': 'bulk',
+    'solve_many': 'bulk',
+    'candidate_lists': 'candidates',
+    'build_tours': 'construction',
+    'complete_tour': 'construction',
+    'greedy_edge_tour': 'construction',
+    'nearest_neighbor_tour': 'construction',
+    'tour_diversity': 'construction',
+    'CoordDistance': 'distance',
+    'TSPInstance': 'instance',
+    'as_instance': 'instance',
+    'colony_islands': 'islands',
+    'improve_tours': 'local_search',
+    'Objective': 'optim_hyper',
+    'Objective_mp': 'optim_hyper',
+    'load_params': 'optim_hyper',
+    'optim_h_params': 'optim_hyper',
+    'optim_h_params_mp': 'optim_hyper',
+    'optim_h_params_sh': 'optim_hyper',
+    'sample_params': 'optim_hyper',
+    'PackedSymmetric': 'distance',
+    'PheromoneStore': 'pheromone',
+    'NO_STATS': 'profiling',
+    'RunStats': 'profiling',
+    'ANT_BATCH': 'streams',
+    'batch_seeds': 'streams',
+    'n_batches': 'streams',
+    'uniform_steps': 'streams',
+    'assign_ants_threats': 'utils',
+    'atraccion_nodos': 'utils',
+    'create_dic_dist': 'utils',
+    'create_dic_dist_from_graph': 'utils',
+    'dic_to_mat': 'utils',
+    'flatten_list_of_list': 'utils',
+    'graph_optim_path': 'utils',
+    'graph_to_mat': 'utils',
+    'init_atrac': 'utils',
+    'init_ferom': 'utils',
+    'plot_graph': 'utils',
+    'plot_nodes_map': 'utils',
+    'plot_rout_map': 'utils',
+    'rand_dist_matrix': 'utils',
+    'read_coord_data': 'utils',
+    'read_data': 'utils',
+    'SharedArray': 'workers',
+    'init_worker': 'workers',
+    'walk_task': 'workers',
+}
+
+_SUBMODULES = {'aco_tsp', 'aco_tsp_oo', 'benchmark', 'bulk', 'candidates', 'cli',
+               'construction', 'distance', 'instance', 'islands', 'local_search',
+               'optim_hyper', 'pheromone', 'profiling', 'streams', 'tsplib', 'utils',
+               'workers'}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | _SUBMODULES)
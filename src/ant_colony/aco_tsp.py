@@ -1,13 +1,34 @@
 
-import random
-import tsplib95
+import time
 import numpy as np
-import networkx as nx
-import matplotlib.pyplot as plt
 from .utils import *
+from .pheromone import PheromoneStore
+from .construction import build_tours, tour_diversity
+from .candidates import candidate_lists
+from .instance import as_instance
+from .local_search import improve_tours
 
-def hormiga_recorre(G, lenghts, dic_attr, tau, init_point, x_best, y_best):
-    """Calcula la ruta y distancia más cortas con respecto al benchmark provisto, 
+def _hormiga_ruta(G, lenghts, dic_attr, init_point, candidates=None):
+    """Recorrido de una hormiga por la red a partir del nodo inicial. No está
+    disponible para los usuarios.
+
+    Args:
+        G (networkx graph): Grafo con relaciones asociadas entre nodos
+        lenghts (dic or np.array): Distancias entre nodos
+        dic_attr (dic or np.array): Atracción de los nodos con respecto a sus vecinos
+        init_point (int): Nodo inicial del recorrido
+        candidates (np.array, optional): Vecinos candidatos de cada nodo
+
+    Returns:
+        list, float: Ruta (con regreso al origen) y su distancia. Si la hormiga
+        no logra recorrer todos los nodos la distancia es infinita.
+    """
+    tours, lengths = build_tours(dic_to_mat(dic_attr), dic_to_mat(lenghts), 
+                                 init_point, 1, candidates=candidates)
+    return tours[0].tolist(), lengths[0]
+
+def hormiga_recorre(G, lenghts, dic_attr, tau, init_point, x_best, y_best, candidates=None):
+    """Calcula la ruta y distancia más cortas con respecto al benchmark provisto, 
     luego del recorrido (o su intento) de una hormiga por la red.
 
     Args:
@@ -18,50 +39,38 @@ def hormiga_recorre(G, lenghts, dic_attr, tau, init_point, x_best, y_best):
         init_point (int): Nodo inicial del recorrido
         x_best (list): Ruta con respecto a la cual se quiere mejorar
         y_best (float): Distancia total del recorrido x_best
+        candidates (np.array, optional): Vecinos candidatos de cada nodo. Default
+        es None (se evalúan todos los vecinos).
 
     Returns:
         list, float: Mejor ruta, mejor distancia
     """
-    random.seed(random.randint(0, 1000))
-    A = dic_attr
-    x = [init_point]
-    nodos = list(G.nodes) 
-
-    while len(x) < len(nodos):
-        i = x[-1]
-        neighbors = set(list(G.neighbors(i))) - set(x)
-        if len(neighbors) == 0:
-            return(x_best, y_best)
-        
-        a_s = [A[i][j] for j in neighbors]
-        next_ = random.choices(list(neighbors), weights= a_s)
-        x = x + next_
+    x, l = _hormiga_ruta(G, lenghts, dic_attr, init_point, candidates)
+    if l == float('inf'):
+        return(x_best, y_best)
 
-    # distancia total del recorrido (se adiciona retorno al origen)
-    l = sum([lenghts[x[i]][x[i+1]] for i in range(0, len(x)-1)]) + lenghts[x[-1]][init_point]
-
-    # aportación a los niveles de feromonas
-    for i in range(1, len(x)):
-        tau[i-1][i] += 1/l  
-        
-    tau[x[-1]][init_point] += 1/l # aportación a los niveles de feromonas
-
-    # sumar regreso al origen
-    x = x + [init_point]
+    # aportación a los niveles de feromonas
+    for i in range(len(x)-1):
+        tau[x[i]][x[i+1]] += 1/l  
     
     if l < y_best:
         return x, l
     else:
         return x_best, y_best  
 
-def ant_colony(G, lenghts, init=0, graph=True, ants=200, max_iter=100,  alpha=1, beta=5, rho=.5, verbose=10):
+def ant_colony(G, lenghts=None, init=0, graph=True, ants=200, max_iter=100,  alpha=1, beta=5, rho=.5, verbose=10,
+               n_neighbors=None, local_search=None, time_limit=None, patience=None,
+               min_diversity=None, seed=None):
     """Computa el algoritmo ant-colony para encontra la ruta con menor distancia en el problema
     TSP.
 
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos
-        lenghts (dic): Diccionario de distancias
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2).
+        lenghts (dic or np.array, optional): Diccionario o matriz de distancias.
+        Default es None (se usan las distancias de G).
         init (int, optional): Nodo inicial del recorrido. Defaults to 0.
         graph (bool, optional): Grafica la mejor ruta encontrada. Default es True.
         ants (int, optional): Número de hormigas por iteracion. Defaults to 200.
@@ -70,6 +79,21 @@ def ant_colony(G, lenghts, init=0, graph=True, ants=200, max_iter=100,  alpha=1,
         beta (int, optional): Factor de influencia de eta. Defaults to 5.
         rho (float, optional): Tasa de evaporación de las feromonas. Defaults to .5.
         verbose (int, optional): Imprime progreso del algoritmo cada K iteraciones. Defaults to 10.
+        n_neighbors (int, optional): Número de vecinos candidatos por nodo para
+        los recorridos. Default es None (se evalúan todos los vecinos).
+        local_search (str or bool, optional): Búsqueda local 2-opt + Or-opt sobre
+        el mejor recorrido de cada iteración ('best' o True) o sobre todos
+        ('all', n_ants veces más costoso). Requiere distancias simétricas.
+        Default es None.
+        time_limit (float, optional): Tiempo máximo en segundos; no se inicia una
+        iteración que terminaría después del límite. Default es None.
+        patience (int, optional): Iteraciones sin mejora antes de detenerse.
+        Default es None.
+        min_diversity (float, optional): Se detiene si la fracción de tramos de
+        los recorridos fuera del mejor recorrido de la iteración es menor a este
+        valor. Default es None.
+        seed (int, optional): Semilla del generador de números aleatorios.
+        Default es None (no reproducible).
 
     Returns:
         list, float: Mejor ruta, mejor distancia
@@ -79,32 +103,75 @@ def ant_colony(G, lenghts, init=0, graph=True, ants=200, max_iter=100,  alpha=1,
     x_best=[]
     y_best= float('inf')
     
-    tau = init_ferom(G)
-    eta = init_atrac(G,lenghts)
+    instance = as_instance(G)
+    init_idx = instance.index_of(init)
+    if lenghts is None:
+        dist = instance.dist
+        store = PheromoneStore.from_instance(instance, alpha=alpha, beta=beta, rho=rho)
+        candidates = instance.candidates(n_neighbors)
+    else:
+        dist = dic_to_mat(lenghts)
+        store = PheromoneStore(dist, instance.adj, alpha=alpha, beta=beta, rho=rho)
+        candidates = None
+        if n_neighbors and n_neighbors < dist.shape[0] - 1:
+            candidates = candidate_lists(dist, n_neighbors, instance.adj)
+    ls_candidates = None
+    if local_search is True:
+        local_search = 'best'
+    if local_search:
+        ls_candidates = candidates
+        if ls_candidates is None:
+            ls_candidates = candidate_lists(dist, min(10, dist.shape[0] - 2), instance.adj)
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    stop_reason = 'max_iter'
+    stall = 0
     for k in range(1, max_iter + 1):
-        A = atraccion_nodos(G, tau, eta, alpha=1, beta=5)
-        for e in tau:
-            for v in tau:
-                tau[e][v] = (1-rho)*v
-                
-        for ant in range(1, ants + 1):
-            x_best, y_best = hormiga_recorre(G,lenghts,  A, tau, init, x_best, y_best)
+        tic = time.perf_counter()
+        A = store.attraction()
+        store.evaporate()
+
+        routes, distances = build_tours(A, dist, init_idx, ants, rng, candidates)
+        if local_search:
+            improve_tours(routes, distances, dist, ls_candidates, local_search)
+        store.deposit(routes, distances)
+
+        bst_idx = int(np.argmin(distances))
+        stall += 1
+        if distances[bst_idx] < y_best:
+            x_best, y_best = instance.labels(routes[bst_idx]), distances[bst_idx]
+            stall = 0
             
         if k%verbose == 0 or k==1:
             print(f'iter: {k} / {max_iter} - dist: {round(y_best, 2)}')
 
-    if k%verbose == 0:
+        # early stopping
+        toc = time.perf_counter()
+        if k == max_iter:
+            break
+        if time_limit is not None and (toc - start) + (toc - tic) > time_limit:
+            stop_reason = 'time_limit'
+        elif patience is not None and stall >= patience:
+            stop_reason = 'patience'
+        elif (min_diversity is not None and 
+              tour_diversity(routes, routes[bst_idx], instance.symmetric) < min_diversity):
+            stop_reason = 'diversity'
+        if stop_reason != 'max_iter':
+            break
+
+    if k%verbose == 0 or stop_reason != 'max_iter':
         print('\n')
         print("-"*30)
         print('Resumen:')
         print(f'\tNro. de hormigas: {ants}')  
-        print(f'\tIteraciones: {max_iter}')  
+        print(f'\tIteraciones: {k} / {max_iter}')  
+        print(f'\tCriterio de paro: {stop_reason}')  
         print(f'\tDistancia: {y_best}') 
         print(f'\tNodo inicial: {init}')  
         print(f'\tRuta: {x_best}') 
         print("-"*30)
         
     if graph:
-        graph_optim_path(G, x_best, y_best)
+        graph_optim_path(instance.to_graph(), x_best, y_best)
 
     return x_best, y_best
@@ -1,58 +1,228 @@
-import random
-import tsplib95
+import json
+import os
+import pickle
+import time
 import numpy as np
-import networkx as nx
-import matplotlib.pyplot as plt
 from .utils import *
+from .pheromone import PheromoneStore
+from .construction import (build_tours, complete_tour, greedy_edge_tour,
+                           nearest_neighbor_tour, tour_diversity)
+from .streams import ANT_BATCH, batch_seeds, n_batches, uniform_steps
+from .instance import TSPInstance, as_instance
+from .distance import CoordDistance, PackedSymmetric
+from .local_search import improve_tours
+from .workers import SharedArray, init_worker, walk_task
+from .profiling import NO_STATS, RunStats
+from collections import namedtuple
 from multiprocessing import Pool
 
-class colony_multiw():
+# registro de avance que iter_solve entrega después de cada iteración
+Progress = namedtuple('Progress', ['iteration', 'best_dist', 'best_tour', 'elapsed'])
+
+class colony():
     """Clase que representa una colonia de hormigas que recorren
-    el grafo asignado para resolver el problema TSP. A diferencia de la
-    clase colony(), esta clase implementa multiprocesamiento para computar 
-    la solución del problema utilizando un pool de workers.
+    el grafo asignado para resolver el problema TSP.
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2).
         init_node (int): Nodo inicial del recorrido.
-        best_route (list, optional): Ruta con respecto a la cual se quiere mejorar.
+        best_route (list, optional): Ruta con respecto a la cual se quiere
+        mejorar. Si no se indica warm_start, la búsqueda arranca desde ella.
         best_dist ([type], optional): Distancia total del recorrido x_best.
-        n_ants (int, optional): Número de hormigas. Default es 2.
+        n_ants (int, optional): Número de hormigas. Default es 2.
         max_iter (int, optional): [description]. Default es 100.
         alpha (int, optional): Factor de influencia de tau. Defaults to 1.
         beta (int, optional): Factor de influencia de eta. Defaults to 5.
-        rho (float, optional): Tasa de evaporación de las feromonas. Defaults to .5.
+        rho (float, optional): Tasa de evaporación de las feromonas. Defaults to .5.
+        n_neighbors (int, optional): Número de vecinos candidatos por nodo para
+        los recorridos. Default es None (se evalúan todos los vecinos).
+        local_search (str or bool, optional): Búsqueda local 2-opt + Or-opt
+        después de construir los recorridos: 'best' (o True) mejora el mejor
+        recorrido de cada iteración y 'all' todos. Cada recorrido cuesta del
+        orden de 0.2 ms por nodo (unos 0.2 s con 1000 nodos), así que 'all'
+        multiplica ese costo por n_ants en cada iteración; en instancias
+        grandes conviene 'best'. Requiere distancias simétricas. Default es None.
+        mmas (bool, optional): Usa MAX-MIN Ant System: solo una ruta deposita
+        feromona en cada iteración y tau se acota a [tau_min, tau_max]. tau se
+        inicializa en tau_max, calculado con un recorrido greedy. Default es False.
+        mmas_best (str, optional): Ruta que deposita en MAX-MIN: 'iteration'
+        (la mejor de la iteración) o 'global' (la mejor encontrada). Default es
+        'iteration'.
+        p_best (float, optional): Probabilidad de construir la mejor ruta al
+        converger, usada para calcular tau_min. Default es .05.
+        warm_start (str or list, optional): Ruta inicial de la búsqueda: 'nn'
+        (vecino más cercano), 'greedy' (greedy por tramos, requiere distancias
+        simétricas) o una ruta previa con etiquetas de nodos, por ejemplo la
+        de una instancia parecida (los nodos que no existen se descartan y los
+        faltantes se insertan donde cuesta menos). tau se inicializa en
+        n_ants/L, con L la distancia de la ruta, la ruta se refuerza con
+        warm_bias y se adopta como mejor ruta. Con mmas, L fija los límites de
+        feromona y tau empieza en tau_max en los tramos de la ruta y en
+        tau_max/(1 + warm_bias) en el resto (sin bajar de tau_min). Default es
+        None (best_route, si se indica).
+        warm_bias (float, optional): Feromona extra sobre los tramos de la ruta
+        inicial, en múltiplos del nivel inicial. Default es 1.0.
+        time_limit (float, optional): Tiempo máximo en segundos. La colonia no
+        inicia una iteración si, con la duración de la anterior, terminaría
+        después del límite. Default es None (sin límite).
+        patience (int, optional): Detiene la búsqueda si la mejor distancia no
+        mejora en patience iteraciones. Default es None.
+        min_diversity (float, optional): Detiene la búsqueda si la diversidad de
+        los recorridos de una iteración (fracción de tramos fuera del mejor
+        recorrido de la iteración) es menor a este valor. Default es None.
+        checkpoint (str, optional): Ruta del .npz donde se guarda el estado de
+        la colonia (ver save_state) cada checkpoint_every iteraciones. Default
+        es None (sin checkpoints).
+        checkpoint_every (int, optional): Iteraciones entre checkpoints.
+        Default es 10.
+        compact (bool, optional): Modo de memoria compacta para instancias
+        grandes: distancias, eta, eta^beta, tau y la atracción en float32 y,
+        si las distancias son simétricas, empacadas como triángulo superior;
+        los recorridos usan int16 si hay a lo más 32768 nodos. Reduce la
+        memoria de las matrices a poco más de un cuarto a cambio de precisión
+        y algo de CPU (ver TSPInstance.compact). Default es False.
+        profile (bool, optional): Mide el tiempo de cada fase del ciclo
+        (atracción, evaporación, recorridos, búsqueda local, depósito, ...) en
+        un RunStats que queda en el atributo stats. Default es False.
+        on_stats (callable, optional): Función que recibe el RunStats al
+        terminar cada ejecución (p. ej. para exportarlo a un sistema de
+        métricas). Activa profile. Default es None.
+        seed (int, optional): Semilla del generador de la colonia. En cada
+        iteración cada lote de ANT_BATCH hormigas recibe su propio generador
+        derivado de este, así que con la misma semilla colony y colony_multiw
+        (con cualquier n_workers) producen los mismos recorridos. Default es
+        None (no reproducible).
         verbose (int, optional): Imprime progreso del algoritmo cada K iteraciones. Defaults to 10.
     """
     def __init__(self, G, init_node,
                  best_route = [],
                  best_dist = float('inf'),
                  n_ants=2,
-                 max_iter=10, 
+                 max_iter=100, 
                  alpha=1, 
                  beta=5, 
-                 rho=.5,
-                 n_workers = 1,
+                 rho=.5, 
+                 n_neighbors=None,
+                 local_search=None,
+                 mmas=False,
+                 mmas_best='iteration',
+                 p_best=.05,
+                 warm_start=None,
+                 warm_bias=1.0,
+                 time_limit=None,
+                 patience=None,
+                 min_diversity=None,
+                 checkpoint=None,
+                 checkpoint_every=10,
+                 compact=False,
+                 profile=False,
+                 on_stats=None,
+                 seed=None,
                  verbose=False, 
-                 k_verbose=10):
-        self.graph = G
-        self.A = None
+                 k_verbose=100):
+        self.instance = as_instance(G)
+        if compact:
+            self.instance = self.instance.compact()
+        self.graph = self.instance.graph
         self.init_node = init_node
+        self.init_idx = self.instance.index_of(init_node)
         self.best_route = best_route
         self.best_dist = best_dist
-        self.lenghts = create_dic_dist_from_graph(self.graph)
+        self.dist = self.instance.dist
+        self.lenghts = self.dist
         self.n_ants = n_ants
         self.max_iter = max_iter
+        self.compact = compact
+        self.tour_dtype = (np.int16 if compact and self.instance.n - 1 <= np.iinfo(np.int16).max
+                           else np.int32)
         self.alpha = alpha
         self.beta = beta
         self.rho = rho
-        self.n_workers = n_workers
-        self.ants_per_worker = assign_ants_threats(self.n_ants, self.n_workers)
-        self.tau = init_ferom(self.graph)
-        self.eta = init_atrac(self.graph, self.lenghts)
+        self.store = PheromoneStore.from_instance(self.instance, alpha=alpha, 
+                                                  beta=beta, rho=rho)
+        self.n_neighbors = n_neighbors
+        self.candidates = self.instance.candidates(n_neighbors)
+        self.local_search = 'best' if local_search is True else local_search
+        self.ls_candidates = None
+        if local_search:
+            if not self.instance.symmetric:
+                raise ValueError('La búsqueda local requiere distancias simétricas')
+            k = min(n_neighbors or 10, self.instance.n - 2)
+            self.ls_candidates = self.instance.candidates(k)
+        self.best_tour = None
+        self._best_array = np.asarray(best_route)
+        self.warm_bias = warm_bias
+        self._warm_tour = None
+        self._warm_start(warm_start)
+        self.mmas = mmas
+        self.mmas_best = mmas_best
+        self.p_best = p_best
+        if mmas:
+            if mmas_best not in ('iteration', 'global'):
+                raise ValueError(f"mmas_best no reconocido: {mmas_best}")
+            if not 0 < rho <= 1:
+                # tau_max = 1/(rho*L)
+                raise ValueError(f'MAX-MIN requiere 0 < rho <= 1, no {rho}')
+            self._init_mmas()
+        self.time_limit = time_limit
+        self.patience = patience
+        self.min_diversity = min_diversity
+        self.stop_reason = None
+        self.n_iter = 0
+        self.elapsed = 0.0
+        self._stall = 0
+        self._diversity = None
+        self._cancel = False
+        self.checkpoint = checkpoint
+        self.checkpoint_every = checkpoint_every
+        self._first_iter = 0
+        self.tau = self.store.tau
+        self.eta = self.instance.eta
         self.verbose = verbose
         self.k_verbose = k_verbose
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.stats = RunStats() if profile or on_stats is not None else None
+        self.on_stats = on_stats
+        self._stats = self.stats or NO_STATS
+
+    @classmethod
+    def from_matrix(cls, dist, init_node=0, **kwargs):
+        """Crea la colonia a partir de una matriz de distancias, sin construir
+        un grafo de networkx.
+
+        Args:
+            dist (np.array): Matriz de distancias entre nodos.
+            init_node (int, optional): Nodo inicial del recorrido. Default es 0.
+            **kwargs: Parámetros restantes de la colonia.
+
+        Returns:
+            (colony): Colonia lista para solve_tsp.
+        """
+        return cls(TSPInstance.from_matrix(dist), init_node, **kwargs)
+
+    @classmethod
+    def from_coords(cls, coords, init_node=0, kind=None, dense=True, **kwargs):
+        """Crea la colonia a partir de coordenadas (n, 2), con distancia
+        euclidiana y sin construir un grafo de networkx.
+
+        Args:
+            coords (np.array): Coordenadas de los nodos.
+            init_node (int, optional): Nodo inicial del recorrido. Default es 0.
+            kind (str, optional): Redondeo de TSPLIB ('EUC_2D' o 'CEIL_2D').
+            Default es None (distancia exacta).
+            dense (bool, optional): Construye la matriz de distancias. Si es
+            False se usa una CoordDistance. Default es True.
+            **kwargs: Parámetros restantes de la colonia.
 
+        Returns:
+            (colony): Colonia lista para solve_tsp.
+        """
+        instance = TSPInstance.from_coords(coords, kind=kind, dense=dense)
+        return cls(instance, init_node, **kwargs)
+        
     def _update_pheromone_levels(self, route, dist_route):
         """Actualiza el nivel de feromonas en las respectivas trayectorias
         del grafo.
@@ -61,9 +231,7 @@ class colony_multiw():
             route (lst): Lista que incluye un recorrido por el grafo.
             dist_route (float): Distancia de la ruta.
         """
-        for i in range(1, len(route[:-1])):
-            self.tau[i-1][i] += 1/dist_route
-        self.tau[route[:-1][-1]][self.init_node]
+        self.store.deposit([route], [dist_route])
         
     def _update_many_pheromone_levels(self, routes, distances):
         """Actualiza los niveles de feromonas para diferentes rutas
@@ -75,276 +243,662 @@ class colony_multiw():
             distances (lst of floats): Lista con las distancias de
             las rutas.
         """
-        if (len(distances) == len(self.graph.nodes)):
-            for i in range(len(routes)):
-                self._update_pheromone_levels(routes[i], distances[i])
-                
+        self.store.deposit(routes, distances)
+            
     def _evaporates_pheromone(self):
         """Evapora los niveles de feromonas en todos los tramos del 
         grafo.
         """
-        for e in self.tau:
-            for v in self.tau:
-                self.tau[e][v] = (1-self.rho)*v
-                
-    def _n_ants_walk(self, n_ants):
-        """Metodo que define el recorrido de varias hormigas sobre un solo
-        worker. 
+        self.store.evaporate()
+            
+    def _colony_run(self, A):
+        """La hormigas de la colonia realizan recorridos 
+        independientes simultáneamente.
 
         Args:
-            n_ants (int): Número de hormigas que procesará el worker asignado.
-
-        Returns:
-            [lst]: Lista de tuplas con distancias y rutas encotnradas por las
-            hormigas del worker.
+            A (np.array): nivel de atracción de los nodos con respecto
+            a sus vecinos.
         """
-        ants_in_thread = [ant(self.graph) for i in range(n_ants)]
-        # solution for each ant
-        for a in ants_in_thread:
-            a.walk_over_graph(self.init_node, self.best_dist, self.A)
-        # tuple with sln for each ant
-        slns = [(a.route, a.r_len) for a in ants_in_thread]
-        return slns
-    
-    def _multiprocessing_bt(self, ants_per_threat, num_cpu):
-        """Aplica multiprocesamiento en todos los workers seleccionados para que 
-        todas las hormigas de la colonia recorran el grafo en una iteración.
+        with self._stats.phase('walk'):
+            routes, distances = self._build_tours(A)
+        self._improve(routes, distances)
+        self._update_best(routes, distances)
+
+    def _build_tours(self, A):
+        """Construye en este proceso los recorridos de todas las hormigas, con
+        un generador por lote de hormigas.
 
         Args:
-            ants_per_threat (lst): Lista con la asignación del número de hormigas
-            de cada worker.
-            num_cpu (int): Número de workers seleccionados.
+            A (np.array): nivel de atracción de los nodos con respecto
+            a sus vecinos.
 
         Returns:
-            [lst]: lsita de tuplas con todas las distancias y recorridos encontrados
-            por todas las hormigas del pool de workers.
+            [tuple]: Recorridos y distancias de todas las hormigas.
         """
-        with Pool(processes=num_cpu) as pool:
-            results = pool.starmap(self._n_ants_walk, ants_per_threat)
-        
-        return flatten_list_of_list(results)
-    
-    def _colony_run(self, A):
-        """La hormigas de la colonia realizan recorridos 
-        independientes simultáneamente en cada wiorker asignado. 
+        u = uniform_steps(batch_seeds(self.rng, self.n_ants), self.n_ants, 
+                          self.instance.n - 1)
+        return build_tours(A, self.dist, self.init_idx, self.n_ants,
+                           candidates=self.candidates, u=u, dtype=self.tour_dtype)
+
+    def _improve(self, routes, distances, mode=None):
+        """Aplica la búsqueda local configurada a los recorridos de la iteración
+        (en su lugar).
 
         Args:
-            A (dic): nivel de atracción de los nodos con respecto
-            a sus vecinos.
+            routes (np.array): Recorridos realizados por las hormigas.
+            distances (np.array): Distancias de los recorridos.
+            mode (str, optional): Modo de búsqueda local. Default es None (el
+            de la colonia).
+        """
+        mode = mode or self.local_search
+        if mode and self.ls_candidates is not None:
+            with self._stats.phase('local_search'):
+                improve_tours(routes, distances, self.dist, self.ls_candidates, mode)
+
+    def _update_best(self, routes, distances):
+        """Deposita las feromonas de los recorridos de la iteración y
+        actualiza la mejor ruta encontrada por la colonia.
+
+        Args:
+            routes (lst of lst): Recorridos realizados por las hormigas.
+            distances (lst of floats): Distancias de los recorridos.
         """
-        # multiprocessing
-        ants_journey = self._multiprocessing_bt(self.ants_per_worker, self.n_workers)
-        
-        # get paths and distances
-        routes, distances = zip(*ants_journey)
-        # updates pheromone levels
-        self._update_many_pheromone_levels(routes, distances)
-            
         # best route
-        bst_idx = np.argmin(distances)
+        bst_idx = int(np.argmin(distances))
         min_dist = distances[bst_idx]
         bst_route = routes[bst_idx]
         
+        if self.min_diversity is not None:
+            self._diversity = tour_diversity(np.asarray(routes), bst_route, 
+                                             self.instance.symmetric)
+
         # improves route if possible
+        self._stall += 1
         if min_dist < self.best_dist:
+            self._stall = 0
             self.best_dist = min_dist
-            self.best_route = bst_route
-            
-    def solve_tsp(self):
-        """Resuelve el problema TSP.
+            self.best_route = self.instance.labels(bst_route)
+            self.best_tour = np.array(bst_route)
+            self._best_array = np.asarray(self.best_route)
+            if self.mmas:
+                self._mmas_bounds(min_dist)
+
+        # updates pheromone levels
+        self._stats.count('tours', len(distances))
+        with self._stats.phase('deposit'):
+            if self.mmas:
+                self._mmas_deposit(bst_route, min_dist)
+            else:
+                self._update_many_pheromone_levels(routes, distances)
+
+    def _warm_start(self, method):
+        """Construye la ruta inicial, inicializa tau a partir de su distancia,
+        refuerza sus tramos y la adopta como mejor ruta.
+
+        Args:
+            method (str or list): 'nn', 'greedy' o una ruta con etiquetas de
+            nodos. Si es None se usa best_route (si no está vacía).
         """
-        route = self.best_route
-        dist = self.best_dist
-        
-        for k in range(self.max_iter):
-            self.A = atraccion_nodos(self.graph,tau= self.tau, eta=self.eta, 
-                                alpha=self.alpha, beta=self.beta)
+        if method is None:
+            if not len(self.best_route):
+                return
+            method = self.best_route
+        adj = self.store.adj
+        if isinstance(method, str):
+            cand = self.instance.candidates(min(self.n_neighbors or 10, self.instance.n - 1))
+            if method == 'nn':
+                tour, length = nearest_neighbor_tour(self.dist, self.init_idx, cand, adj)
+            elif method == 'greedy':
+                if not self.instance.symmetric:
+                    raise ValueError('El warm start greedy requiere distancias simétricas')
+                tour, length = greedy_edge_tour(self.dist, self.init_idx, cand, adj)
+            else:
+                raise ValueError(f"warm_start no reconocido: {method}")
+        else:
+            index = self.instance.index
+            order = [index[node] for node in method if node in index]
+            tour, length = complete_tour(order, self.dist, self.init_idx, adj)
+        if not np.isfinite(length):
+            # the route uses missing edges: nothing to start from
+            return
+
+        self._warm_tour = (tour, length)
+        m = max(self.n_ants, 1)
+        self.store.reset(m/length)
+        self.store.deposit(tour[None], [length], q=self.warm_bias*m)
+        if self.best_tour is None and length <= self.best_dist:
+            self.best_dist = length
+            self.best_tour = tour
+            self.best_route = self.instance.labels(tour)
+            self._best_array = np.asarray(self.best_route)
+
+    def _init_mmas(self):
+        """Inicializa MAX-MIN Ant System: calcula los límites de feromona a
+        partir de un recorrido greedy (vecino más cercano) y fija tau en tau_max.
+        """
+        _, length = nearest_neighbor_tour(self.dist, self.init_idx, 
+                                          self.instance.candidates(self.n_neighbors or 10),
+                                          self.store.adj)
+        length = min(length, self.best_dist)
+        if not np.isfinite(length):
+            # greedy tour stuck on a sparse graph: fall back to a rough bound
+            dist = self.dist.data if isinstance(self.dist, PackedSymmetric) else self.dist
+            length = float(np.max(dist)) * self.instance.n
+        self._mmas_bounds(length)
+        self.store.reset(self.store.tau_max)
+        if self._warm_tour is not None:
+            # keep the warm-start bias: tau_max on the route, the same
+            # (1 + warm_bias) ratio as without MMAS elsewhere
+            tour, length = self._warm_tour
+            tau_max = self.store.tau_max
+            self.store.reset(tau_max/(1 + self.warm_bias))
+            self.store.deposit(tour[None], [length],
+                               q=tau_max*self.warm_bias/(1 + self.warm_bias)*length)
+            self.store.clamp()
+
+    def _mmas_bounds(self, length):
+        """Actualiza tau_max = 1/(rho*L) y tau_min según p_best (Stützle y Hoos).
+
+        Args:
+            length (float): Distancia de la mejor ruta conocida.
+        """
+        n = self.instance.n
+        tau_max = 1/(self.rho*length)
+        p_dec = self.p_best**(1/n)
+        avg = max(n/2 - 1, 1)
+        tau_min = min(tau_max*(1 - p_dec)/(avg*p_dec), tau_max)
+        self.store.set_bounds(tau_min, tau_max)
+
+    def _mmas_deposit(self, route, dist_route):
+        """Deposita feromona solo sobre la ruta elegida por MAX-MIN (mejor de
+        la iteración o mejor global) y acota tau.
+
+        Args:
+            route (np.array): Mejor recorrido de la iteración.
+            dist_route (float): Distancia del recorrido.
+        """
+        if self.mmas_best == 'global' and self.best_tour is not None:
+            route, dist_route = self.best_tour, self.best_dist
+        self.store.deposit(np.asarray(route)[None], [dist_route])
+        self.store.clamp()
+
+
+    def migrate(self, tour, dist_route):
+        """Incorpora una ruta encontrada por otra colonia: si es mejor que la
+        propia, la adopta como mejor ruta y deposita feromona sobre ella.
+
+        Args:
+            tour (np.array): Recorrido en índices internos, con regreso al origen.
+            dist_route (float): Distancia del recorrido.
+        """
+        if not dist_route < self.best_dist:
+            return
+        tour = np.asarray(tour)
+        self.best_dist = dist_route
+        self.best_tour = tour.copy()
+        self.best_route = self.instance.labels(tour)
+        self._best_array = np.asarray(self.best_route)
+        self._stall = 0
+        if self.mmas:
+            self._mmas_bounds(dist_route)
+        self.store.deposit(tour[None], [dist_route])
+        self.store.clamp()
             
-            if k>1:
-                self._evaporates_pheromone()
+    def _start_run(self):
+        """Prepara los recursos que viven durante toda la ejecución de
+        solve_tsp.
+        """
+        pass
+
+    def _end_run(self):
+        """Libera los recursos creados en _start_run.
+        """
+        pass
+
+    def _check_stop(self, elapsed, last):
+        """Revisa los criterios de paro anticipado después de una iteración.
+
+        Args:
+            elapsed (float): Segundos transcurridos desde el inicio de solve_tsp.
+            last (float): Duración en segundos de la última iteración.
+
+        Returns:
+            (str): Criterio que detiene la búsqueda ('time_limit', 'patience'
+            o 'diversity'), o None si debe continuar.
+        """
+        if self.time_limit is not None and elapsed + last > self.time_limit:
+            return 'time_limit'
+        if self.patience is not None and self._stall >= self.patience:
+            return 'patience'
+        if (self.min_diversity is not None and self._diversity is not None
+                and self._diversity < self.min_diversity):
+            return 'diversity'
+        return None
+
+    def iter_solve(self):
+        """Resuelve el problema TSP entregando el avance después de cada
+        iteración. El consumidor puede detener la búsqueda en cualquier momento
+        saliendo del ciclo (o con close()), o desde otro hilo con stop(); en
+        ambos casos stop_reason queda en 'cancelled' y los recursos de la
+        ejecución se liberan.
+
+        Yields:
+            (Progress): Iteración, mejor distancia, mejor ruta (np.array con
+            las etiquetas de los nodos) y segundos transcurridos.
+        """
+        start = time.perf_counter()
+        self.stop_reason = 'max_iter'
+        # a run restored with load_state continues where it was saved
+        first, self._first_iter = self._first_iter, 0
+        if first == 0:
+            self._stall = 0
+            self._stats.reset()
+        self._cancel = False
+        try:
+            # inside the try so a partial start is still released by _end_run
+            with self._stats.phase('start'):
+                self._start_run()
+            for k in range(first, self.max_iter):
+                tic = time.perf_counter()
+                with self._stats.phase('attraction'):
+                    A = self.store.attraction()
                 
-            # ants running across the graph
-            self._colony_run(self.A)
+                if k>1:
+                    with self._stats.phase('evaporation'):
+                        self._evaporates_pheromone()
+
+                # ants running across the graph
+                self._colony_run(A)
+                self.n_iter = k + 1
+                self._stats.count('iterations')
+
+                if self.checkpoint and self.n_iter % self.checkpoint_every == 0:
+                    with self._stats.phase('checkpoint'):
+                        self.save_state(self.checkpoint)
+
+                if self.verbose and (k%self.k_verbose==0):
+                    print(f'iter: {k} / {self.max_iter} - dist: {round(self.best_dist, 2)}')
+
+                toc = time.perf_counter()
+                self.elapsed = toc - start
+                yield Progress(self.n_iter, self.best_dist, self._best_array, self.elapsed)
+
+                if self._cancel:
+                    self.stop_reason = 'cancelled'
+                    break
+                reason = self._check_stop(time.perf_counter() - start, toc - tic)
+                if reason is not None and k + 1 < self.max_iter:
+                    self.stop_reason = reason
+                    break
+        except GeneratorExit:
+            self.stop_reason = 'cancelled'
+            raise
+        finally:
+            with self._stats.phase('end'):
+                self._end_run()
+            self.elapsed = time.perf_counter() - start
+            if self.stats is not None and self.on_stats is not None:
+                self.on_stats(self.stats)
+
+    def save_state(self, path):
+        """Guarda en un .npz el estado de la colonia necesario para continuar
+        la búsqueda: feromonas (solo el triángulo superior si son simétricas),
+        límites de MAX-MIN, mejor recorrido, iteración y estado del generador
+        de números aleatorios. La escritura es atómica.
+
+        Args:
+            path (str): Ruta del archivo .npz.
+        """
+        tau = self.store.tau
+        state = {
+            'n': self.instance.n,
+            'init_idx': self.init_idx,
+            'iteration': self.n_iter,
+            'stall': self._stall,
+            'best_dist': self.best_dist,
+            'best_tour': np.zeros(0, np.int32) if self.best_tour is None else self.best_tour,
+            'tau_bounds': np.array([] if self.store.tau_max is None else
+                                   [self.store.tau_min, self.store.tau_max]),
+            'rng_state': json.dumps(self.rng.bit_generator.state),
+        }
+        if isinstance(tau, PackedSymmetric):
+            # same layout as tau[np.triu_indices(n)]
+            state['tau_triu'] = tau.data
+        elif self.store.symmetric and np.array_equal(tau, tau.T):
+            state['tau_triu'] = tau[np.triu_indices(self.instance.n)]
+        else:
+            state['tau'] = tau
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(tmp, path)
+
+    def load_state(self, path):
+        """Restaura el estado guardado con save_state. La siguiente llamada a
+        iter_solve o solve_tsp continúa desde la iteración guardada y, con el
+        mismo generador, produce exactamente los mismos resultados que la
+        ejecución original.
+
+        Args:
+            path (str): Ruta del archivo .npz.
+        """
+        with np.load(path) as state:
+            n = self.instance.n
+            if int(state['n']) != n or int(state['init_idx']) != self.init_idx:
+                raise ValueError(f'{path} no corresponde a esta instancia y nodo inicial')
+            if isinstance(self.store.tau, PackedSymmetric):
+                tau = state['tau_triu'] if 'tau_triu' in state else \
+                    PackedSymmetric.from_dense(state['tau']).data
+                self.store.tau.data[...] = tau
+            elif 'tau_triu' in state:
+                iu = np.triu_indices(n)
+                self.store.tau[iu] = state['tau_triu']
+                self.store.tau.T[iu] = state['tau_triu']
+            else:
+                self.store.tau[...] = state['tau']
+            bounds = state['tau_bounds']
+            if bounds.size:
+                self.store.set_bounds(float(bounds[0]), float(bounds[1]))
+            self.n_iter = int(state['iteration'])
+            self._stall = int(state['stall'])
+            self.best_dist = float(state['best_dist'])
+            if state['best_tour'].size:
+                self.best_tour = state['best_tour']
+                self.best_route = self.instance.labels(self.best_tour)
+                self._best_array = np.asarray(self.best_route)
+            self.rng.bit_generator.state = json.loads(str(state['rng_state']))
+        self._first_iter = self.n_iter
+
+    def run(self, n_iter):
+        """Continúa la búsqueda n_iter iteraciones más a partir de la última
+        iteración realizada.
+
+        Args:
+            n_iter (int): Número de iteraciones adicionales.
+        """
+        self.max_iter = self.n_iter + n_iter
+        self._first_iter = self.n_iter
+        for _ in self.iter_solve():
+            pass
+
+    def stop(self):
+        """Pide detener iter_solve (o solve_tsp) al terminar la iteración en curso.
+        """
+        self._cancel = True
 
-            if self.verbose and (k%self.k_verbose==0):
-                print(f'iter: {k} / {self.max_iter} - dist: {round(self.best_dist, 2)}')
+    def solve_tsp(self, callback=None):
+        """Resuelve el problema TSP. La búsqueda termina al llegar a max_iter o
+        antes, si se cumple alguno de los criterios de paro (time_limit,
+        patience o min_diversity); el criterio queda en stop_reason.
+
+        Args:
+            callback (callable, optional): Función que recibe el Progress de
+            cada iteración. Si regresa True la búsqueda se detiene
+            (stop_reason 'cancelled'); si lanza una excepción, esta se propaga
+            después de liberar los recursos. Default es None.
+        """
+        for progress in self.iter_solve():
+            if callback is not None and callback(progress):
+                self.stop()
 
         if self.verbose:
             print('\n')
             print("-"*30)
             print('Resumen:')
             print(f'\tNro. de hormigas: {self.n_ants}')  
-            print(f'\tIteraciones: {self.max_iter}')  
+            print(f'\tIteraciones: {self.n_iter} / {self.max_iter}')  
+            print(f'\tCriterio de paro: {self.stop_reason}')  
             print(f'\tDistancia: {self.best_dist}') 
             print(f'\tNodo inicial: {self.init_node}')  
             print(f'\tRuta: {self.best_route}') 
             print("-"*30)
+            if self.stats is not None:
+                print(self.stats.report())
+                print("-"*30)
+                
 
     def plot_route(self, plt_size=(12, 8)):
         """Grafica la trayectoria encontrada por la colonia en el grafo.
 
         Args:
-            plt_size (tuple, optional): Tamaño del gŕafico (ancho x altura). Defaults es (12, 8).
+            plt_size (tuple, optional): Tamaño del gŕafico (ancho x altura). Defaults es (12, 8).
         """
-        graph_optim_path(self.graph, self.best_route, self.best_dist, plt_size)
+        graph_optim_path(self.instance.to_graph(), self.best_route, self.best_dist, plt_size)
 
-class colony():
+class colony_multiw(colony):
     """Clase que representa una colonia de hormigas que recorren
-    el grafo asignado para resolver el problema TSP.
+    el grafo asignado para resolver el problema TSP. A diferencia de la
+    clase colony(), esta clase implementa multiprocesamiento para computar 
+    la solución del problema utilizando un pool de workers. El pool vive
+    durante toda la ejecución de solve_tsp; las distancias, la atracción, las
+    listas de candidatos y los recorridos viven en memoria compartida, de modo
+    que en cada iteración cada worker solo recibe el rango de hormigas que le
+    corresponde. Si el trabajo por iteración es poco (n_ants * n^2 <
+    min_pool_work) no se crea el pool, pues su costo supera al de los recorridos.
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2).
         init_node (int): Nodo inicial del recorrido.
-        best_route (list, optional): Ruta con respecto a la cual se quiere mejorar.
+        best_route (list, optional): Ruta con respecto a la cual se quiere
+        mejorar. Si no se indica warm_start, la búsqueda arranca desde ella.
         best_dist ([type], optional): Distancia total del recorrido x_best.
-        n_ants (int, optional): Número de hormigas. Default es 2.
+        n_ants (int, optional): Número de hormigas. Default es 2.
         max_iter (int, optional): [description]. Default es 100.
         alpha (int, optional): Factor de influencia de tau. Defaults to 1.
         beta (int, optional): Factor de influencia de eta. Defaults to 5.
-        rho (float, optional): Tasa de evaporación de las feromonas. Defaults to .5.
+        rho (float, optional): Tasa de evaporación de las feromonas. Defaults to .5.
+        n_neighbors (int, optional): Número de vecinos candidatos por nodo para
+        los recorridos. Default es None (se evalúan todos los vecinos).
+        local_search (str or bool, optional): Búsqueda local 2-opt + Or-opt
+        después de construir los recorridos: 'best' (o True) mejora el mejor
+        recorrido de cada iteración y 'all' todos, repartidos entre los
+        workers (ver el costo en colony). Requiere distancias simétricas.
+        Default es None.
+        mmas (bool, optional): Usa MAX-MIN Ant System (ver colony). Default es False.
+        mmas_best (str, optional): Ruta que deposita en MAX-MIN: 'iteration' o
+        'global'. Default es 'iteration'.
+        p_best (float, optional): Parámetro de tau_min en MAX-MIN. Default es .05.
+        warm_start (str or list, optional): Ruta inicial de la búsqueda: 'nn',
+        'greedy' o una ruta previa (ver colony). Default es None.
+        warm_bias (float, optional): Feromona extra sobre la ruta inicial.
+        Default es 1.0.
+        time_limit (float, optional): Tiempo máximo en segundos. Default es None.
+        patience (int, optional): Iteraciones sin mejora antes de detenerse.
+        Default es None.
+        min_diversity (float, optional): Diversidad mínima de los recorridos
+        antes de detenerse. Default es None.
+        checkpoint (str, optional): Ruta del .npz de checkpoints. Default es None.
+        checkpoint_every (int, optional): Iteraciones entre checkpoints.
+        Default es 10.
+        compact (bool, optional): Modo de memoria compacta (ver colony); los
+        workers comparten los triángulos empacados. Default es False.
+        profile (bool, optional): Mide el tiempo de cada fase (ver colony),
+        incluyendo el arranque del pool ('start') y los bytes enviados a los
+        workers. Default es False.
+        on_stats (callable, optional): Función que recibe el RunStats al
+        terminar cada ejecución; activa profile. Default es None.
+        seed (int, optional): Semilla de la colonia; los resultados no dependen
+        de n_workers (ver colony). Default es None.
+        n_workers (int, optional): Número de workers del pool. Default es 1.
         verbose (int, optional): Imprime progreso del algoritmo cada K iteraciones. Defaults to 10.
     """
+    min_pool_work = 1000000
+
     def __init__(self, G, init_node,
                  best_route = [],
                  best_dist = float('inf'),
                  n_ants=2,
-                 max_iter=100, 
+                 max_iter=10, 
                  alpha=1, 
                  beta=5, 
-                 rho=.5, 
+                 rho=.5,
+                 n_neighbors=None,
+                 local_search=None,
+                 mmas=False,
+                 mmas_best='iteration',
+                 p_best=.05,
+                 warm_start=None,
+                 warm_bias=1.0,
+                 time_limit=None,
+                 patience=None,
+                 min_diversity=None,
+                 checkpoint=None,
+                 checkpoint_every=10,
+                 compact=False,
+                 profile=False,
+                 on_stats=None,
+                 seed=None,
+                 n_workers = 1,
                  verbose=False, 
-                 k_verbose=100):
-        self.graph = G
-        self.init_node = init_node
-        self.best_route = best_route
-        self.best_dist = best_dist
-        self.lenghts = create_dic_dist_from_graph(self.graph)
+                 k_verbose=10):
+        super().__init__(G, init_node,
+                         best_route=best_route,
+                         best_dist=best_dist,
+                         n_ants=n_ants,
+                         max_iter=max_iter,
+                         alpha=alpha,
+                         beta=beta,
+                         rho=rho,
+                         n_neighbors=n_neighbors,
+                         local_search=local_search,
+                         mmas=mmas,
+                         mmas_best=mmas_best,
+                         p_best=p_best,
+                         warm_start=warm_start,
+                         warm_bias=warm_bias,
+                         time_limit=time_limit,
+                         patience=patience,
+                         min_diversity=min_diversity,
+                         checkpoint=checkpoint,
+                         checkpoint_every=checkpoint_every,
+                         compact=compact,
+                         profile=profile,
+                         on_stats=on_stats,
+                         seed=seed,
+                         verbose=verbose,
+                         k_verbose=k_verbose)
+        self.A = None
         self.n_ants = n_ants
-        self.ants = [ant(G) for i in range(self.n_ants)]
-        self.max_iter = max_iter
-        self.alpha = alpha
-        self.beta = beta
-        self.rho = rho
-        self.tau = init_ferom(self.graph)
-        self.eta = init_atrac(self.graph, self.lenghts)
-        self.verbose = verbose
-        self.k_verbose = k_verbose
-        
-    def _update_pheromone_levels(self, route, dist_route):
-        """Actualiza el nivel de feromonas en las respectivas trayectorias
-        del grafo.
+        self.n_workers = n_workers
+        # each ant takes its stream by index, so the split can be even
+        self.ants_per_worker = assign_ants_threats(n_ants, n_workers)
+                
+        self._pool = None
+        self._shared = {}
 
-        Args:
-            route (lst): Lista que incluye un recorrido por el grafo.
-            dist_route (float): Distancia de la ruta.
+    def _start_run(self):
+        """Crea el pool de workers y los arreglos compartidos que viven durante
+        toda la ejecución de solve_tsp.
         """
-        for i in range(1, len(route[:-1])):
-            self.tau[i-1][i] += 1/dist_route
-        self.tau[route[:-1][-1]][self.init_node]
-        
-    def _update_many_pheromone_levels(self, routes, distances):
-        """Actualiza los niveles de feromonas para diferentes rutas
-        recorridas por diferentes hormigas.
+        n = self.dist.shape[0]
+        if self.n_workers <= 1 or self.n_ants*n*n < self.min_pool_work:
+            return
+        # implicit distances travel as coordinates instead of a shared matrix
+        oracle = self.dist if isinstance(self.dist, CoordDistance) else None
+        # packed matrices are shared as their upper triangle
+        packed = isinstance(self.store.A, PackedSymmetric)
+        # filled one block at a time so _end_run can release a partial start
+        self._shared = {}
+        self._shared['A'] = SharedArray.from_array(self.store.A.data if packed else self.store.A)
+        self._shared['tours'] = SharedArray((self.n_ants, n + 1), self.tour_dtype)
+        self._shared['lengths'] = SharedArray((self.n_ants,), np.float64)
+        if oracle is None:
+            dist = self.dist.data if isinstance(self.dist, PackedSymmetric) else self.dist
+            self._shared['dist'] = SharedArray.from_array(dist)
+        if self.candidates is not None:
+            self._shared['candidates'] = SharedArray.from_array(self.candidates)
+        if self.ls_candidates is not None:
+            self._shared['ls_candidates'] = SharedArray.from_array(self.ls_candidates)
+        # the store writes the attraction straight into shared memory
+        A = self._shared['A'].array
+        self.store.A = self.store.A.like(A) if packed else A
+        specs = {key: arr.spec for key, arr in self._shared.items()}
+        if self.stats is not None:
+            self.stats.add_bytes('shared', sum(arr.array.nbytes for arr in self._shared.values()))
+            self.stats.add_bytes('initargs', self.n_workers*len(pickle.dumps((specs, oracle))))
+        self._pool = Pool(processes=self.n_workers, initializer=init_worker, 
+                          initargs=(specs, oracle))
+
+    def _end_run(self):
+        """Cierra el pool de workers y libera la memoria compartida.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._shared:
+            self.store.A = self.store.A.copy()
+            # nothing public may keep viewing the released blocks
+            self.A = self.store.A
+            for arr in self._shared.values():
+                arr.close()
+            self._shared = {}
+    
+    def _multiprocessing_bt(self, ants_per_threat):
+        """Aplica multiprocesamiento en todos los workers seleccionados para que 
+        todas las hormigas de la colonia recorran el grafo en una iteración.
 
         Args:
-            routes (lst of lst): Lista que contiene los recorridos 
-            realziados por diferentes hormigas.
-            distances (lst of floats): Lista con las distancias de
-            las rutas.
-        """
-        if (len(distances) == len(self.graph.nodes)):
-            for i in range(len(routes)):
-                self._update_pheromone_levels(routes[i], distances[i])
-            
-    def _evaporates_pheromone(self):
-        """Evapora los niveles de feromonas en todos los tramos del 
-        grafo.
+            ants_per_threat (lst): Lista con la asignación del número de hormigas
+            de cada worker.
+
+        Returns:
+            [tuple]: Todos los recorridos y distancias encontrados por todas las
+            hormigas del pool de workers.
         """
-        for e in self.tau:
-            for v in self.tau:
-                self.tau[e][v] = (1-self.rho)*v
-            
+        bounds = np.cumsum([0] + [a[0] for a in ants_per_threat])
+        seeds = batch_seeds(self.rng, self.n_ants)
+        ls_mode = 'all' if self.local_search == 'all' else None
+        tasks = [(int(lo), int(hi), self.init_idx, 
+                  seeds[lo//ANT_BATCH:n_batches(hi)].tolist(), ls_mode, self.n_ants)
+                 for lo, hi in zip(bounds[:-1], bounds[1:])]
+        results = self._pool.starmap(walk_task, tasks)
+        if self.stats is not None:
+            # only indices and seeds travel; tours come back through shared memory
+            self.stats.add_bytes('tasks', len(pickle.dumps(tasks)))
+            self.stats.add_bytes('results', len(pickle.dumps(results)))
+        return self._shared['tours'].array, self._shared['lengths'].array
+    
     def _colony_run(self, A):
         """La hormigas de la colonia realizan recorridos 
-        independientes simultáneamente.
+        independientes simultáneamente en cada wiorker asignado. 
 
         Args:
-            A (dic): nivel de atracción de los nodos con respecto
+            A (np.array): nivel de atracción de los nodos con respecto
             a sus vecinos.
         """
-        distances = []
-        routes = []
-        for ant in self.ants:
-            ant.walk_over_graph(init_node=self.init_node, 
-                                dist = self.lenghts, 
-                                atrac = A)
-            
-            routes.append(ant.route)
-            distances.append(ant.r_len)
-            
-        # updates pheromone levels
-        self._update_many_pheromone_levels(routes, distances)
-            
-        # best route
-        min_dist = min(distances)
-        bst_idx = distances.index(min_dist)
-        bst_route = self.ants[bst_idx].route
-        
-        # improves route if possible
-        if min_dist < self.best_dist:
-            self.best_dist = min_dist
-            self.best_route = bst_route
-            
-    def solve_tsp(self):
-        """Resuelve el problema TSP.
-        """
-        route = self.best_route
-        dist = self.best_dist
-        
-        for k in range(self.max_iter):
-            A = atraccion_nodos(self.graph,tau= self.tau, eta=self.eta, 
-                                alpha=self.alpha, beta=self.beta)
-            
-            if k>1:
-                self._evaporates_pheromone()
-
-            # ants running across the graph
-            self._colony_run(A)
-
-            if self.verbose and (k%self.k_verbose==0):
-                print(f'iter: {k} / {self.max_iter} - dist: {round(self.best_dist, 2)}')
-
-        if self.verbose:
-            print('\n')
-            print("-"*30)
-            print('Resumen:')
-            print(f'\tNro. de hormigas: {self.n_ants}')  
-            print(f'\tIteraciones: {self.max_iter}')  
-            print(f'\tDistancia: {self.best_dist}') 
-            print(f'\tNodo inicial: {self.init_node}')  
-            print(f'\tRuta: {self.best_route}') 
-            print("-"*30)
-                
-
-    def plot_route(self, plt_size=(12, 8)):
-        """Grafica la trayectoria encontrada por la colonia en el grafo.
-
-        Args:
-            plt_size (tuple, optional): Tamaño del gŕafico (ancho x altura). Defaults es (12, 8).
-        """
-        graph_optim_path(self.graph, self.best_route, self.best_dist, plt_size)
+        self.A = A
+        if self._pool is not None:
+            # multiprocessing
+            with self._stats.phase('walk'):
+                routes, distances = self._multiprocessing_bt(self.ants_per_worker)
+            # 'all' already ran inside the workers
+            if self.local_search == 'best':
+                self._improve(routes, distances)
+        else:
+            # too little work to pay for the pool
+            with self._stats.phase('walk'):
+                routes, distances = self._build_tours(A)
+            self._improve(routes, distances)
+        self._update_best(routes, distances)
 
 class ant():
     """Clase que representa una hormiga de la colonia y realizará
     recorridos por el grafo.
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos
+        G (networkx graph or TSPInstance): Grafo con relaciones asociadas entre
+        nodos o instancia compilada del problema.
+        seed (int, optional): Semilla de los recorridos de la hormiga. Default
+        es None (no reproducible).
     """
-    def __init__(self, G, r_len = float('inf'), route = []):
+    def __init__(self, G, r_len = float('inf'), route = [], seed=None):
         
         self.graph = G
-        self.seed = 19512959
+        self.seed = seed
+        self.rng = np.random.default_rng(self.seed)
         self.route = route
         self.r_len = r_len
         self.atraction_mat = None
@@ -352,37 +906,32 @@ class ant():
     def walk_over_graph(self, 
                       init_node,
                       dist, 
-                      atrac):
+                      atrac,
+                      candidates=None):
         """La hormiga intenta recorrer el grafo y volver
         al origen sin repetir otros nodos.
 
         Args:
             init_node (int): Nodo inicial del recorrido.
-            dist (dic): Diccionario de distancias de las trayectorias.
-            atrac (dic): Diccionario de atracción de los nodos con 
-            relación a sus vecinos.
+            dist (dic or np.array): Distancias de las trayectorias. Si la hormiga
+            recorre una TSPInstance puede ser None (se usan las de la instancia).
+            atrac (dic or np.array): Atracción de los nodos con 
+            relación a sus vecinos.
+            candidates (np.array, optional): Vecinos candidatos de cada nodo.
+            Default es None (se evalúan todos los vecinos).
         """
-        
-        x = [init_node]
-        nodes = list(self.graph.nodes)
-        lenghts = create_dic_dist_from_graph(self.graph)
-        
-        while len(x) < len(nodes):
-            i = x[-1]
-            neighbors = set(list(self.graph.neighbors(i))) - set(x)
-            if len(neighbors) == 0:
-                break
-        
-            a_s = [atrac[i][j] for j in neighbors]
-            next_ = random.choices(list(neighbors), weights= a_s)
-            x = x + next_
-
-        # distancia total del recorrido (se adiciona retorno al origen)
-        l = sum([lenghts[x[i]][x[i+1]] for i in range(0, len(x)-1)]) + lenghts[x[-1]][init_node] 
-
-        # sumar regreso al origen
-        self.route = x + [init_node]   
-        self.r_len = l
+        init_idx = init_node
+        if isinstance(self.graph, TSPInstance):
+            init_idx = self.graph.index_of(init_node)
+            if dist is None:
+                dist = self.graph.dist
+        tours, lengths = build_tours(dic_to_mat(atrac), dic_to_mat(dist), 
+                                     init_idx, 1, self.rng, candidates)
+        if isinstance(self.graph, TSPInstance):
+            self.route = self.graph.labels(tours[0])
+        else:
+            self.route = tours[0].tolist()
+        self.r_len = lengths[0]
             
     def plot_route(self, plt_size):
         """Grafica la trayectoria encontrada por la colonia en el grafo.
@@ -390,6 +939,9 @@ class ant():
         Args:
             plt_size (tuple, optional): Tamaño del gŕafico (ancho x altura). Defaults es (12, 8).
         """
-        graph_optim_path(self.graph, self.route, self.r_len, plt_size)
+        G = self.graph
+        if isinstance(G, TSPInstance):
+            G = G.to_graph()
+        graph_optim_path(G, self.route, self.r_len, plt_size)
 
 
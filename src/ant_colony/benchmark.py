@@ -0,0 +1,281 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from .aco_tsp import ant_colony
+from .aco_tsp_oo import colony, colony_multiw
+from .instance import TSPInstance
+
+# óptimos conocidos (TSPLIB / FSU) por caso; las submuestras de ch71009 no
+# tienen óptimo conocido (el de la instancia completa no aplica), así que
+# esos casos reportan gap None
+OPTIMA = {'gr17': 2085, 'dantzig42': 699, 'p01': 291}
+
+# instancias del benchmark: nombre, archivo y tamaño de la submuestra (None es completa)
+CASES = [
+    ('gr17', 'gr17_d_city_distances.txt', None),
+    ('dantzig42', 'dantzig42_d.txt', None),
+    ('p01', 'p01_d.txt', None),
+    ('ch71009-100', 'ch71009.tsp', 100),
+    ('ch71009-500', 'ch71009.tsp', 500),
+]
+
+# tiempo máximo de importación (s) de los módulos que usan los workers y el CLI
+IMPORT_BUDGET = {
+    'ant_colony': .1,
+    'ant_colony.cli': .1,
+    'ant_colony.aco_tsp_oo': .5,
+}
+
+# librerías que no deben cargarse al importar el núcleo del solver
+HEAVY_MODULES = ('matplotlib', 'folium', 'networkx', 'pandas', 'scipy', 'optuna',
+                 'tsplib95')
+
+# parámetros fijos de cada solver
+SOLVERS = {
+    'colony': dict(n_ants=20, max_iter=30, n_neighbors=15),
+    'colony_multiw': dict(n_ants=20, max_iter=30, n_neighbors=15, n_workers=2),
+    'ant_colony': dict(ants=20, max_iter=30, n_neighbors=15),
+}
+
+
+def load_case(name, path, size=None, seed=1999, data_dir='./datasets'):
+    """Carga la instancia de un caso del benchmark. Las submuestras de
+    ch71009 usan siempre la misma semilla.
+
+    Args:
+        name (str): Nombre del caso.
+        path (str): Archivo de la instancia dentro de data_dir.
+        size (int, optional): Nodos de la submuestra. Default es None (completa).
+        seed (int, optional): Semilla de la submuestra. Default es 1999.
+        data_dir (str, optional): Carpeta de los datos. Default es './datasets'.
+
+    Returns:
+        (TSPInstance): Instancia del caso.
+    """
+    full = os.path.join(data_dir, path)
+    if size is None:
+        return TSPInstance.from_tsplib(full)
+    return TSPInstance.from_tsplib(full, dense=False).subsample(size, seed)
+
+
+def warm_caches(instance, solvers):
+    """Construye los cachés de la instancia que usan los solvers (eta^beta y
+    listas de vecinos), para que no se cobren al primer solver medido y los
+    tiempos de todos sean comparables.
+
+    Args:
+        instance (TSPInstance): Instancia del caso.
+        solvers (dic): Parámetros por solver.
+    """
+    for params in solvers.values():
+        instance.eta_beta(params.get('beta', 5))
+        k = params.get('n_neighbors')
+        instance.candidates(k)
+        if params.get('local_search'):
+            instance.candidates(min(k or 10, instance.n - 2))
+
+
+def run_case(instance, solver, params, seed=1959):
+    """Resuelve una instancia con un solver y mide su desempeño. Antes de
+    medir se hace una ejecución de una iteración sin cronometrar, para que
+    los módulos que se importan hasta usarse (p. ej. scipy en las listas de
+    vecinos) no se cobren al primer caso.
+
+    Args:
+        instance (TSPInstance): Instancia a resolver.
+        solver (str): 'colony', 'colony_multiw' o 'ant_colony'.
+        params (dic): Parámetros del solver.
+        seed (int, optional): Semilla de la colonia. Default es 1959.
+
+    Returns:
+        (dic): Iteraciones, tiempo total y por iteración (s), memoria pico (MB)
+        y mejor distancia, más el tiempo por fase de las colonias (ver
+        RunStats). La memoria pico solo cuenta el proceso principal (no los
+        workers de colony_multiw).
+    """
+    init = instance.nodes[0]
+
+    def solve(**override):
+        kwargs = dict(params, **override)
+        with contextlib.redirect_stdout(io.StringIO()):
+            if solver == 'ant_colony':
+                _, best = ant_colony(instance, init=init, graph=False,
+                                     verbose=kwargs['max_iter'], seed=seed, **kwargs)
+                return best, kwargs['max_iter'], None
+            cls = colony if solver == 'colony' else colony_multiw
+            colony_ = cls(instance, init, profile=True, seed=seed, **kwargs)
+            # colony_multiw always uses its pool here, so its rows measure the
+            # parallel path even on the small cases
+            colony_.min_pool_work = 0
+            colony_.solve_tsp()
+            return colony_.best_dist, colony_.n_iter, dict(colony_.stats.times)
+
+    solve(max_iter=1)
+    start = time.perf_counter()
+    best, n_iter, phases = solve()
+    elapsed = time.perf_counter() - start
+    # tracemalloc slows down allocations: memory is measured on a second,
+    # identical (seeded) run
+    tracemalloc.start()
+    solve()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'n_iter': n_iter,
+            'time': elapsed,
+            'time_per_iter': elapsed / max(n_iter, 1),
+            'peak_mem_mb': peak / 2**20,
+            'best': float(best),
+            'phases': phases}
+
+
+def run_benchmarks(cases=None, solvers=None, data_dir='./datasets', seed=1959):
+    """Ejecuta el benchmark completo: cada caso con cada solver.
+
+    Args:
+        cases (lst, optional): Casos (nombre, archivo, tamaño). Default es None (CASES).
+        solvers (dic, optional): Parámetros por solver. Default es None (SOLVERS).
+        data_dir (str, optional): Carpeta de los datos. Default es './datasets'.
+        seed (int, optional): Semilla de las colonias. Default es 1959.
+
+    Returns:
+        (lst): Un registro por caso y solver, con el gap (%) respecto al óptimo
+        conocido cuando existe.
+    """
+    results = []
+    for name, path, size in cases or CASES:
+        instance = load_case(name, path, size, data_dir=data_dir)
+        optimum = OPTIMA.get(name)
+        warm_caches(instance, solvers or SOLVERS)
+        for solver, params in (solvers or SOLVERS).items():
+            record = {'case': name, 'solver': solver, 'n': instance.n}
+            record.update(run_case(instance, solver, params, seed))
+            record['optimum'] = optimum
+            record['gap'] = None if optimum is None else 100*(record['best'] - optimum)/optimum
+            results.append(record)
+    return results
+
+
+def import_times(modules=None, repeat=3):
+    """Mide el tiempo de importación de cada módulo en un intérprete nuevo y
+    las librerías pesadas que carga.
+
+    Args:
+        modules (iterable, optional): Módulos a medir. Default es None (los de
+        IMPORT_BUDGET).
+        repeat (int, optional): Repeticiones; se reporta el mínimo. Default es 3.
+
+    Returns:
+        (lst): Un registro por módulo con el tiempo (s) y las librerías de
+        HEAVY_MODULES cargadas.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    records = []
+    for module in modules or IMPORT_BUDGET:
+        code = ('import sys, time; t = time.perf_counter(); import {}; '
+                'print(time.perf_counter() - t); '
+                'print(",".join(m for m in {!r} if m in sys.modules))').format(module, HEAVY_MODULES)
+        times = []
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, '-c', code], env=env, cwd=root,
+                                 capture_output=True, text=True, check=True).stdout.split('\n')
+            times.append(float(out[0]))
+        records.append({'module': module, 'time': min(times),
+                        'heavy': [m for m in out[1].split(',') if m]})
+    return records
+
+
+def check_imports(records, budget=None):
+    """Revisa los tiempos de importación contra el presupuesto.
+
+    Args:
+        records (lst): Registros de import_times.
+        budget (dic, optional): Tiempo máximo (s) por módulo. Default es None
+        (IMPORT_BUDGET).
+
+    Returns:
+        (lst): Mensajes con cada módulo fuera de presupuesto o que carga
+        librerías pesadas.
+    """
+    budget = budget or IMPORT_BUDGET
+    regressions = []
+    for r in records:
+        limit = budget.get(r['module'])
+        if limit is not None and r['time'] > limit:
+            regressions.append(f"import {r['module']}: {r['time']:.3f}s > {limit}s")
+        if r['heavy']:
+            regressions.append(f"import {r['module']} loads {', '.join(r['heavy'])}")
+    return regressions
+
+
+def compare(results, baseline, time_tol=.5, quality_tol=.02, mem_tol=.5):
+    """Compara resultados contra un baseline y regresa las regresiones.
+
+    Args:
+        results (lst): Registros de run_benchmarks.
+        baseline (lst): Registros de referencia.
+        time_tol (float, optional): Aumento relativo tolerado del tiempo por
+        iteración. Default es .5.
+        quality_tol (float, optional): Aumento relativo tolerado de la mejor
+        distancia. Default es .02.
+        mem_tol (float, optional): Aumento relativo tolerado de la memoria pico.
+        Default es .5.
+
+    Returns:
+        (lst): Mensajes con cada regresión encontrada.
+    """
+    ref = {(r['case'], r['solver']): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = ref.get((r['case'], r['solver']))
+        if b is None:
+            continue
+        for key, tol in (('time_per_iter', time_tol), ('best', quality_tol),
+                         ('peak_mem_mb', mem_tol)):
+            if r[key] > b[key]*(1 + tol):
+                regressions.append(f"{r['case']}/{r['solver']}: {key} {r[key]:.4g} > "
+                                   f"{b[key]:.4g} (+{100*tol:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    """Punto de entrada: python -m ant_colony.benchmark [--out results.json]
+    [--baseline baseline.json]. Revisa además el presupuesto de tiempo de
+    importación. Termina con código 1 si hay regresiones.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark de los solvers ACO-TSP')
+    parser.add_argument('--out', help='Archivo JSON con los resultados')
+    parser.add_argument('--baseline', help='Archivo JSON de referencia')
+    parser.add_argument('--data-dir', default='./datasets')
+    parser.add_argument('--time-tol', type=float, default=.5)
+    parser.add_argument('--quality-tol', type=float, default=.02)
+    parser.add_argument('--mem-tol', type=float, default=.5)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(data_dir=args.data_dir)
+    report = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+
+    regressions = check_imports(import_times())
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions += compare(results, json.load(f), args.time_tol,
+                                   args.quality_tol, args.mem_tol)
+    for msg in regressions:
+        print('REGRESSION', msg, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
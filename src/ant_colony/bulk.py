@@ -0,0 +1,99 @@
+import time
+import numpy as np
+from collections import namedtuple
+from multiprocessing import Pool, cpu_count
+from .aco_tsp_oo import colony
+from .instance import TSPInstance, as_instance
+
+# resultado de cada instancia de solve_many (error solo con skip_errors)
+Solution = namedtuple('Solution', ['index', 'n', 'best_route', 'best_dist', 'n_iter',
+                                   'stop_reason', 'elapsed', 'error'], defaults=(None,))
+
+
+def solve_many(instances, params=None, n_workers=None, time_limit=None, seed=None,
+               ordered=False, chunksize=1, pool=None, skip_errors=False):
+    """Resuelve muchas instancias (típicamente pequeñas) repartiendo instancias
+    completas entre los procesos de un pool que vive durante todo el lote: cada
+    instancia se resuelve con una colony en un solo proceso, así que no hay
+    comunicación entre workers y el rendimiento crece con el número de cores.
+    Los resultados se entregan conforme se terminan.
+
+    Args:
+        instances (iterable): Instancias a resolver: grafos de networkx,
+        TSPInstance, matrices de distancias (n, n), coordenadas (n, 2) o rutas
+        a archivos TSPLIB (se leen en el worker).
+        params (dic or lst, optional): Parámetros de colony (n_ants, max_iter,
+        alpha, ...), comunes a todas las instancias o uno por instancia. Puede
+        incluir init_node (si no, se usa el primer nodo), seed y time_limit,
+        que se usan cuando no se indican en solve_many. Default es None.
+        n_workers (int, optional): Número de procesos. Con 1 se resuelve en
+        este proceso. Default es None (todos los cores).
+        time_limit (float or lst, optional): Tiempo máximo en segundos de cada
+        instancia, común o uno por instancia. Default es None.
+        seed (int, optional): Semilla del lote; cada instancia recibe una
+        semilla derivada de ella y de su posición, así que los resultados no
+        dependen de n_workers. Default es None.
+        ordered (bool, optional): Entrega los resultados en el orden de las
+        instancias en lugar de conforme terminan. Default es False.
+        chunksize (int, optional): Instancias enviadas juntas a un worker.
+        Default es 1.
+        pool (multiprocessing.Pool, optional): Pool existente para reutilizar
+        entre lotes; no se cierra al terminar. Default es None (se crea uno).
+        skip_errors (bool, optional): Una instancia que no se puede leer o
+        resolver no detiene el lote: su Solution tiene stop_reason 'error' y el
+        mensaje en error. Default es False (se propaga la excepción).
+
+    Yields:
+        (Solution): Posición de la instancia, número de nodos, mejor ruta, mejor
+        distancia, iteraciones, criterio de paro, segundos de la instancia y
+        mensaje de error (None si se resolvió).
+    """
+    seeds = np.random.SeedSequence(seed)
+    tasks = (
+        (i, G, params[i] if isinstance(params, (list, tuple)) else params or {},
+         time_limit[i] if isinstance(time_limit, (list, tuple)) else time_limit,
+         None if seed is None else int(seeds.spawn(1)[0].generate_state(1)[0]),
+         skip_errors)
+        for i, G in enumerate(instances))
+
+    if pool is None and n_workers == 1:
+        for task in tasks:
+            yield _solve_task(task)
+        return
+
+    own = pool is None
+    if own:
+        pool = Pool(processes=n_workers or cpu_count())
+    try:
+        run = pool.imap if ordered else pool.imap_unordered
+        for solution in run(_solve_task, tasks, chunksize):
+            yield solution
+    finally:
+        if own:
+            pool.terminate()
+            pool.join()
+
+
+def _solve_task(task):
+    """Resuelve una instancia de solve_many. No está disponible para los
+    usuarios.
+    """
+    i, G, params, time_limit, seed, skip_errors = task
+    start = time.perf_counter()
+    try:
+        instance = TSPInstance.from_tsplib(G) if isinstance(G, str) else as_instance(G)
+        params = dict(params)
+        init_node = params.pop('init_node', instance.nodes[0])
+        # the solve_many arguments win over params unless they are None
+        own_limit, own_seed = params.pop('time_limit', None), params.pop('seed', None)
+        time_limit = own_limit if time_limit is None else time_limit
+        seed = own_seed if seed is None else seed
+        colony_ = colony(instance, init_node, time_limit=time_limit, seed=seed, **params)
+        colony_.solve_tsp()
+    except Exception as exc:
+        if not skip_errors:
+            raise
+        return Solution(i, None, None, float('inf'), 0, 'error', time.perf_counter() - start,
+                        f'{type(exc).__name__}: {exc}')
+    return Solution(i, instance.n, colony_.best_route, colony_.best_dist, colony_.n_iter,
+                    colony_.stop_reason, time.perf_counter() - start)
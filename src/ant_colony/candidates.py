@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def candidate_lists(dist, k, adj=None, chunk=1024):
+    """Calcula la lista de los k vecinos más cercanos de cada nodo a partir de
+    la matriz de distancias, usando un ordenamiento parcial por renglón.
+
+    Args:
+        dist (np.array): Matriz de distancias entre nodos.
+        k (int): Número de vecinos candidatos por nodo.
+        adj (np.array, optional): Matriz booleana de trayectorias existentes.
+        Default es None (toda distancia positiva es trayectoria).
+        chunk (int, optional): Número de renglones procesados a la vez. Default es 1024.
+
+    Returns:
+        (np.array): Arreglo (n, k) de int32 con los vecinos de cada nodo,
+        ordenados de menor a mayor distancia.
+    """
+    n = dist.shape[0]
+    k = min(k, n - 1)
+    cand = np.empty((n, k), dtype=np.int32)
+    for lo in range(0, n, chunk):
+        hi = min(lo + chunk, n)
+        d = np.array(dist[lo:hi], dtype=np.float64)
+        if adj is None:
+            d[d <= 0] = np.inf
+        else:
+            d[~adj[lo:hi]] = np.inf
+        d[np.arange(hi - lo), np.arange(lo, hi)] = np.inf
+        part = np.argpartition(d, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(d, part, axis=1), axis=1)
+        cand[lo:hi] = np.take_along_axis(part, order, axis=1)
+    return cand
+
+
+def candidate_lists_coords(coords, k):
+    """Calcula la lista de los k vecinos más cercanos de cada nodo a partir de
+    sus coordenadas, usando un KD-tree.
+
+    Args:
+        coords (np.array): Arreglo (n, 2) con las coordenadas de los nodos.
+        k (int): Número de vecinos candidatos por nodo.
+
+    Returns:
+        (np.array): Arreglo (n, k) de int32 con los vecinos de cada nodo,
+        ordenados de menor a mayor distancia.
+    """
+    from scipy.spatial import cKDTree
+
+    n = coords.shape[0]
+    k = min(k, n - 1)
+    _, idx = cKDTree(coords).query(coords, k + 1)
+    idx = idx.reshape(n, k + 1)
+    # con coordenadas repetidas el propio nodo no siempre es el primero
+    not_self = idx != np.arange(n)[:, None]
+    keep = np.argsort(~not_self, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(idx, keep, axis=1).astype(np.int32)
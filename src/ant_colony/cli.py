@@ -0,0 +1,159 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# extensiones que se buscan al recibir un directorio
+EXTENSIONS = ('.tsp', '.txt')
+
+
+def find_files(paths):
+    """Expande los directorios de la lista en sus archivos .tsp y .txt.
+
+    Args:
+        paths (lst): Archivos o directorios.
+
+    Returns:
+        (lst): Archivos a resolver, en orden alfabético dentro de cada directorio.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.endswith(EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def build_params(args):
+    """Parámetros de la colonia: los del estudio de optuna (--params-from), si
+    se indica, sobrescritos por los que se den explícitamente.
+
+    Args:
+        args (argparse.Namespace): Argumentos de la línea de comandos.
+
+    Returns:
+        (dic): Parámetros para colony.
+    """
+    params = {}
+    if args.params_from:
+        # optuna is only imported when a study is requested
+        from .optim_hyper import load_params
+        params.update(load_params(args.params_from))
+    explicit = {'n_ants': args.ants, 'max_iter': args.iters, 'alpha': args.alpha,
+                'beta': args.beta, 'rho': args.rho, 'n_neighbors': args.neighbors,
+                'local_search': args.local_search, 'mmas': args.mmas or None,
+                'compact': args.compact or None}
+    params.update({k: v for k, v in explicit.items() if v is not None})
+    return params
+
+
+def _json_default(obj):
+    """Convierte a JSON los escalares de numpy. No está disponible para los
+    usuarios.
+    """
+    return obj.item() if hasattr(obj, 'item') else str(obj)
+
+
+def main(argv=None):
+    """Punto de entrada del comando aco-tsp: resuelve uno o varios archivos y
+    escribe un renglón JSON por archivo con la ruta, su distancia y los tiempos.
+    Los archivos que no se pueden leer o resolver se reportan en stderr sin
+    detener el lote.
+
+    Args:
+        argv (lst, optional): Argumentos. Default es None (sys.argv).
+
+    Returns:
+        (int): Código de salida: 1 si algún archivo falló.
+    """
+    parser = argparse.ArgumentParser(
+        prog='aco-tsp', description='Resuelve instancias TSP con una colonia de hormigas.')
+    parser.add_argument('paths', nargs='+', help='Archivos .tsp/.txt o directorios con ellos')
+    parser.add_argument('--ants', type=int, help='Número de hormigas (default 2)')
+    parser.add_argument('--iters', type=int, help='Número de iteraciones (default 100)')
+    parser.add_argument('--alpha', type=float, help='Influencia de tau (default 1)')
+    parser.add_argument('--beta', type=float, help='Influencia de eta (default 5)')
+    parser.add_argument('--rho', type=float, help='Tasa de evaporación (default .5)')
+    parser.add_argument('--neighbors', type=int, help='Vecinos candidatos por nodo')
+    parser.add_argument('--local-search', choices=['best', 'all'], help='Búsqueda local 2-opt + Or-opt')
+    parser.add_argument('--mmas', action='store_true', help='Usa MAX-MIN Ant System')
+    parser.add_argument('--compact', action='store_true',
+                        help='Matrices en float32 y triángulo superior (menos memoria)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos: reparten los archivos o, con un solo archivo, '
+                             'las hormigas de la colonia (default 1)')
+    parser.add_argument('--time-limit', type=float, help='Tiempo máximo por archivo (s)')
+    parser.add_argument('--seed', type=int, help='Semilla')
+    parser.add_argument('--init-node', type=int, help='Nodo inicial (default el primero)')
+    parser.add_argument('--params-from', metavar='DB',
+                        help='Base sqlite de un estudio de optuna (ver load_params)')
+    parser.add_argument('--out', help='Archivo JSON lines de salida (default stdout)')
+    args = parser.parse_args(argv)
+
+    files = find_files(args.paths)
+    if not files:
+        parser.error('no se encontraron archivos .tsp o .txt')
+    params = build_params(args)
+    if args.init_node is not None:
+        params['init_node'] = args.init_node
+
+    out = open(args.out, 'w') if args.out else sys.stdout
+    failed = 0
+    try:
+        for record in _solve(files, params, args):
+            if 'error' in record:
+                # a bad file is reported and the rest of the batch goes on
+                failed += 1
+                print(f"aco-tsp: {record['file']}: {record['error']}", file=sys.stderr)
+                continue
+            out.write(json.dumps(record, default=_json_default) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+
+def _solve(files, params, args):
+    """Resuelve los archivos y genera el registro de cada uno. No está
+    disponible para los usuarios.
+    """
+    if len(files) == 1 and args.workers > 1:
+        from .aco_tsp_oo import colony_multiw
+        from .instance import TSPInstance
+
+        start = time.perf_counter()
+        try:
+            instance = TSPInstance.from_tsplib(files[0])
+            kwargs = dict(params)
+            init_node = kwargs.pop('init_node', instance.nodes[0])
+            colony_ = colony_multiw(instance, init_node, n_workers=args.workers,
+                                    time_limit=args.time_limit, seed=args.seed, **kwargs)
+            colony_.solve_tsp()
+        except Exception as exc:
+            yield {'file': files[0], 'error': f'{type(exc).__name__}: {exc}'}
+            return
+        yield {'file': files[0], 'n': instance.n, 'best_dist': colony_.best_dist,
+               'tour': colony_.best_route, 'n_iter': colony_.n_iter,
+               'stop_reason': colony_.stop_reason,
+               'elapsed': time.perf_counter() - start, 'params': params}
+        return
+
+    from .bulk import solve_many
+
+    for sol in solve_many(files, params, n_workers=min(args.workers, len(files)),
+                          time_limit=args.time_limit, seed=args.seed, ordered=True,
+                          skip_errors=True):
+        if sol.error is not None:
+            yield {'file': files[sol.index], 'error': sol.error}
+            continue
+        yield {'file': files[sol.index], 'n': sol.n,
+               'best_dist': sol.best_dist, 'tour': sol.best_route, 'n_iter': sol.n_iter,
+               'stop_reason': sol.stop_reason, 'elapsed': sol.elapsed, 'params': params}
+
+
+if __name__ == '__main__':
+    sys.exit(main())
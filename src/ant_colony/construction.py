@@ -0,0 +1,319 @@
+import numpy as np
+from .streams import rng_steps
+
+
+def build_tours(A, dist, init_node, n_ants, rng=None, candidates=None, u=None,
+                dtype=np.int32):
+    """Construye simultáneamente los recorridos de n_ants hormigas. En cada paso
+    todas las hormigas avanzan un nodo: se enmascaran los nodos visitados y se
+    elige el siguiente nodo por ruleta sobre la fila de atracción del nodo actual.
+    Si se proveen listas de candidatos, la ruleta se hace solo entre los
+    candidatos no visitados y se recorre el renglón completo únicamente cuando
+    ya se visitaron todos.
+
+    Args:
+        A (np.array): Matriz de atracción de los nodos con respecto a sus vecinos.
+        dist (np.array): Matriz de distancias entre nodos.
+        init_node (int): Nodo inicial del recorrido.
+        n_ants (int): Número de hormigas.
+        rng (np.random.Generator, optional): Generador de números aleatorios.
+        Default es None (se crea uno nuevo).
+        candidates (np.array, optional): Arreglo (n, k) con los vecinos candidatos
+        de cada nodo. Default es None (se evalúan todos los vecinos).
+        u (iterable, optional): Uniformes de la ruleta de cada paso (n_ants por
+        paso, ver streams.uniform_steps). Default es None (se generan por
+        bloques con rng).
+        dtype (np.dtype, optional): Tipo de dato de los recorridos (np.int16
+        basta hasta 32767 nodos). Default es np.int32.
+
+    Returns:
+        (np.array, np.array): Recorridos (n_ants x n+1, con regreso al
+        origen) y sus distancias. Las hormigas que no logran completar el
+        recorrido tienen distancia infinita.
+    """
+    n = A.shape[0]
+    if u is None:
+        if rng is None:
+            rng = np.random.default_rng()
+        u = rng_steps(rng, n_ants, n - 1)
+    steps = iter(u)
+    tours = np.empty((n_ants, n + 1), dtype=dtype)
+    visited = np.zeros((n_ants, n), dtype=bool)
+    complete = np.ones(n_ants, dtype=bool)
+    ants = np.arange(n_ants)
+    cur = np.full(n_ants, init_node, dtype=np.intp)
+
+    tours[:, 0] = init_node
+    tours[:, n] = init_node
+    visited[:, init_node] = True
+
+    for step in range(1, n):
+        u = next(steps)
+        if candidates is None:
+            nxt, ok = _full_scan(A, visited, cur, u)
+        else:
+            cand = candidates[cur]
+            w = A[cur[:, None], cand]
+            w[visited[ants[:, None], cand]] = 0.0
+            pick, ok = roulette(w, u)
+            nxt = cand[ants, pick].astype(np.intp)
+            if not ok.all():
+                # candidatos agotados: se recorre el renglón completo
+                fb = np.flatnonzero(~ok)
+                nxt[fb], ok[fb] = _full_scan(A, visited[fb], cur[fb], u[fb])
+        if not ok.all():
+            # sin vecinos disponibles: se completa la ruta y se descarta
+            complete &= ok
+            nxt[~ok] = np.argmin(visited[~ok], axis=1)
+        tours[:, step] = nxt
+        visited[ants, nxt] = True
+        cur = nxt
+
+    lengths = tour_lengths(dist, tours)
+    lengths[~complete] = np.inf
+    return tours, lengths
+
+
+def nearest_neighbor_tour(dist, init_node, candidates=None, adj=None):
+    """Construye un recorrido greedy: desde cada nodo se avanza al vecino no
+    visitado más cercano. Si se proveen listas de candidatos (ordenadas por
+    distancia) se buscan primero ahí y solo se recorre el renglón completo de
+    distancias cuando ya se visitaron todos.
+
+    Args:
+        dist (np.array or CoordDistance): Matriz de distancias entre nodos.
+        init_node (int): Nodo inicial del recorrido.
+        candidates (np.array, optional): Arreglo (n, k) con los vecinos
+        candidatos de cada nodo. Default es None.
+        adj (np.array, optional): Matriz booleana de trayectorias existentes.
+        Default es None (grafo completo).
+
+    Returns:
+        (np.array, float): Recorrido (n+1, int32, con regreso al origen) y su
+        distancia. Si no se logra completar el recorrido la distancia es infinita.
+    """
+    n = dist.shape[0]
+    tour = np.empty(n + 1, dtype=np.int32)
+    visited = np.zeros(n, dtype=bool)
+    tour[0] = tour[n] = init_node
+    visited[init_node] = True
+    complete = True
+    cur = init_node
+    for step in range(1, n):
+        nxt = -1
+        if candidates is not None:
+            cand = candidates[cur]
+            free = cand[~visited[cand]]
+            if free.size:
+                nxt = int(free[0])
+        if nxt < 0:
+            row = np.where(visited, np.inf, dist[cur])
+            if adj is not None:
+                row[~adj[cur]] = np.inf
+            nxt = int(np.argmin(row))
+            if not np.isfinite(row[nxt]):
+                complete = False
+                nxt = int(np.argmin(visited))
+        tour[step] = nxt
+        visited[nxt] = True
+        cur = nxt
+    if complete and adj is not None:
+        complete = bool(adj[tour[n - 1], init_node])
+    length = float(tour_lengths(dist, tour[None])[0]) if complete else np.inf
+    return tour, length
+
+
+def greedy_edge_tour(dist, init_node, candidates=None, adj=None):
+    """Construye un recorrido greedy por tramos (greedy matching): se ordenan
+    los tramos de las listas de candidatos por distancia y se aceptan en ese
+    orden mientras ningún nodo quede con más de dos tramos ni se cierre un
+    ciclo antes de tiempo. Los fragmentos resultantes se unen por el extremo
+    libre más cercano. Suele ser más corto que el del vecino más cercano.
+    Supone distancias simétricas.
+
+    Args:
+        dist (np.array or CoordDistance): Matriz de distancias entre nodos.
+        init_node (int): Nodo inicial del recorrido.
+        candidates (np.array, optional): Arreglo (n, k) con los vecinos
+        candidatos de cada nodo. Default es None (todos los pares de nodos).
+        adj (np.array, optional): Matriz booleana de trayectorias existentes.
+        Default es None (grafo completo).
+
+    Returns:
+        (np.array, float): Recorrido (n+1, int32, con regreso al origen) y su
+        distancia. Si el recorrido usa trayectorias inexistentes la distancia es
+        infinita.
+    """
+    n = dist.shape[0]
+    if candidates is None:
+        a, b = np.triu_indices(n, 1)
+    else:
+        src = np.repeat(np.arange(n), candidates.shape[1])
+        dst = candidates.ravel().astype(np.intp)
+        keys = np.unique(np.minimum(src, dst)*n + np.maximum(src, dst))
+        a, b = keys // n, keys % n
+    if adj is not None:
+        ok = adj[a, b]
+        a, b = a[ok], b[ok]
+    order = np.argsort(np.asarray(dist[a, b]), kind='stable')
+
+    deg = np.zeros(n, dtype=np.int8)
+    links = [[] for _ in range(n)]
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    n_edges = 0
+    for i, j in zip(a[order].tolist(), b[order].tolist()):
+        if deg[i] == 2 or deg[j] == 2:
+            continue
+        ri, rj = find(i), find(j)
+        if ri == rj:
+            continue
+        parent[ri] = rj
+        deg[i] += 1
+        deg[j] += 1
+        links[i].append(j)
+        links[j].append(i)
+        n_edges += 1
+        if n_edges == n - 1:
+            break
+
+    # fragments are paths; chain them through the nearest free endpoint
+    free = np.flatnonzero(deg < 2)
+    used = np.zeros(n, dtype=bool)
+    path = []
+    cur = int(free[0]) if free.size else init_node
+    while True:
+        # walk the fragment that starts at cur
+        prev = -1
+        while True:
+            path.append(cur)
+            used[cur] = True
+            nxt = [j for j in links[cur] if j != prev and not used[j]]
+            if not nxt:
+                break
+            prev, cur = cur, nxt[0]
+        ends = free[~used[free]]
+        if ends.size == 0:
+            break
+        cur = int(ends[np.argmin(dist[cur, ends])])
+
+    tour = np.array(path, dtype=np.int32)
+    start = int(np.flatnonzero(tour == init_node)[0])
+    tour = np.append(np.roll(tour, -start), init_node).astype(np.int32)
+    complete = adj is None or bool(adj[tour[:-1], tour[1:]].all())
+    length = float(tour_lengths(dist, tour[None])[0]) if complete else np.inf
+    return tour, length
+
+
+def complete_tour(order, dist, init_node, adj=None):
+    """Convierte una secuencia parcial de nodos (por ejemplo, la ruta de una
+    instancia parecida resuelta antes) en un recorrido completo: se descartan
+    los nodos repetidos y se inserta cada nodo faltante en la posición más
+    barata (cheapest insertion).
+
+    Args:
+        order (np.array): Nodos en el orden de visita, sin importar si incluye
+        el regreso al origen.
+        dist (np.array or CoordDistance): Matriz de distancias entre nodos.
+        init_node (int): Nodo inicial del recorrido.
+        adj (np.array, optional): Matriz booleana de trayectorias existentes.
+        Default es None (grafo completo).
+
+    Returns:
+        (np.array, float): Recorrido (n+1, int32, con regreso al origen) y su
+        distancia. Si el recorrido usa trayectorias inexistentes la distancia es
+        infinita.
+    """
+    n = dist.shape[0]
+    order = np.asarray(order, dtype=np.intp)
+    _, first = np.unique(order, return_index=True)
+    path = order[np.sort(first)].tolist()
+    if init_node not in path:
+        path.insert(0, init_node)
+    seen = np.zeros(n, dtype=bool)
+    seen[path] = True
+    for x in np.flatnonzero(~seen).tolist():
+        p = np.array(path)
+        q = np.roll(p, -1)
+        cost = np.asarray(dist[p, x]) + np.asarray(dist[x, q]) - np.asarray(dist[p, q])
+        path.insert(int(np.argmin(cost)) + 1, x)
+    tour = np.array(path, dtype=np.int32)
+    start = int(np.flatnonzero(tour == init_node)[0])
+    tour = np.append(np.roll(tour, -start), init_node).astype(np.int32)
+    complete = adj is None or bool(adj[tour[:-1], tour[1:]].all())
+    length = float(tour_lengths(dist, tour[None])[0]) if complete else np.inf
+    return tour, length
+
+
+def _full_scan(A, visited, cur, u):
+    """Ruleta sobre todos los nodos no visitados. No está disponible para los
+    usuarios.
+    """
+    w = A[cur]
+    w[visited] = 0.0
+    return roulette(w, u)
+
+
+def roulette(w, u):
+    """Selección por ruleta sobre cada renglón de una matriz de pesos.
+
+    Args:
+        w (np.array): Pesos no negativos (hormigas x opciones).
+        u (np.array): Números uniformes en [0, 1), uno por renglón.
+
+    Returns:
+        (np.array, np.array): Columna elegida en cada renglón y máscara de los
+        renglones con al menos un peso positivo.
+    """
+    cum = np.cumsum(w, axis=1)
+    tot = cum[:, -1]
+    nxt = np.argmax(cum > (u*tot)[:, None], axis=1)
+    return nxt, tot > 0
+
+
+def tour_lengths(dist, tours):
+    """Calcula la distancia total de varios recorridos. La suma se acumula en
+    float64 aunque las distancias sean float32.
+
+    Args:
+        dist (np.array): Matriz de distancias entre nodos.
+        tours (np.array): Recorridos (hormigas x pasos) que incluyen el regreso
+        al origen.
+
+    Returns:
+        (np.array): Distancia de cada recorrido.
+    """
+    return dist[tours[:, :-1], tours[:, 1:]].sum(axis=1, dtype=np.float64)
+
+
+def tour_diversity(tours, best, symmetric=True):
+    """Diversidad de los recorridos de una iteración: fracción promedio de sus
+    tramos que no pertenecen al recorrido best. Vale 0 cuando todas las
+    hormigas construyen el mismo recorrido.
+
+    Args:
+        tours (np.array): Recorridos (hormigas x n+1) con regreso al origen.
+        best (np.array): Recorrido de referencia (n+1).
+        symmetric (bool, optional): Considera (i, j) y (j, i) el mismo tramo.
+        Default es True.
+
+    Returns:
+        (float): Diversidad en [0, 1].
+    """
+    n = tours.shape[1] - 1
+
+    def keys(t):
+        a = t[..., :-1].astype(np.int64)
+        b = t[..., 1:].astype(np.int64)
+        if symmetric:
+            a, b = np.minimum(a, b), np.maximum(a, b)
+        return a*n + b
+
+    shared = np.isin(keys(tours), keys(np.asarray(best)))
+    return float(1 - shared.mean())
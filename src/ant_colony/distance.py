@@ -0,0 +1,365 @@
+import math
+import numpy as np
+from collections import OrderedDict
+
+# redondeo de las distancias euclidianas según EDGE_WEIGHT_TYPE de TSPLIB
+_ROUNDING = {
+    None: None,
+    'EUC_2D': lambda d: np.floor(d + 0.5),
+    'CEIL_2D': np.ceil,
+}
+_ROUNDING_SCALAR = {
+    None: float,
+    'EUC_2D': lambda d: float(math.floor(d + 0.5)),
+    'CEIL_2D': lambda d: float(math.ceil(d)),
+}
+
+_SCALARS = (int, np.integer)
+
+
+class CoordDistance(object):
+    """Distancias euclidianas implícitas entre nodos con coordenadas. Se
+    comporta como una matriz de n x n de solo lectura (dist[i], dist[i, j] y
+    dist[rows, cols] con índices vectorizados), pero cada distancia se calcula
+    a partir de las coordenadas al momento de pedirla, de modo que nunca se
+    guarda la matriz completa. Los renglones pedidos se pueden guardar en un
+    caché LRU acotado.
+
+    Args:
+        coords (np.array): Coordenadas (n, 2) de los nodos.
+        kind (str, optional): Redondeo de TSPLIB: 'EUC_2D' (entero más cercano)
+        o 'CEIL_2D' (hacia arriba). Default es None (distancia exacta).
+        cache_rows (int, optional): Número máximo de renglones en caché.
+        Default es 0 (sin caché).
+    """
+    ndim = 2
+    dtype = np.dtype(np.float64)
+
+    def __init__(self, coords, kind=None, cache_rows=0):
+        self.coords = np.ascontiguousarray(coords, dtype=np.float64)
+        self.n = self.coords.shape[0]
+        self.shape = (self.n, self.n)
+        self.kind = None if kind is None else kind.upper()
+        if self.kind not in _ROUNDING:
+            raise ValueError(f'EDGE_WEIGHT_TYPE no soportado: {kind}')
+        self._round = _ROUNDING[self.kind]
+        self._round_scalar = _ROUNDING_SCALAR[self.kind]
+        self._x = self.coords[:, 0].copy()
+        self._y = self.coords[:, 1].copy()
+        # copias como listas para las distancias entre pares de escalares
+        self._xl = self._x.tolist()
+        self._yl = self._y.tolist()
+        self._all = np.arange(self.n)
+        self.cache_rows = cache_rows
+        self._rows = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def pair(self, i, j):
+        """Distancia entre dos nodos.
+
+        Args:
+            i (int): Nodo origen.
+            j (int): Nodo destino.
+
+        Returns:
+            (float): Distancia entre i y j.
+        """
+        dx = self._xl[i] - self._xl[j]
+        dy = self._yl[i] - self._yl[j]
+        return self._round_scalar(math.sqrt(dx*dx + dy*dy))
+
+    def __reduce__(self):
+        # el caché no viaja a otros procesos
+        return (CoordDistance, (self.coords, self.kind, self.cache_rows))
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def T(self):
+        """Transpuesta (la distancia euclidiana es simétrica).
+        """
+        return self
+
+    def pairs(self, i, j):
+        """Distancias entre los nodos i y j, con broadcasting de numpy.
+
+        Args:
+            i (int or np.array): Nodos origen.
+            j (int or np.array): Nodos destino.
+
+        Returns:
+            (np.array): Distancias con la forma de broadcast de i y j.
+        """
+        x, y = self._x, self._y
+        dx = x[i] - x[j]
+        dy = y[i] - y[j]
+        d = np.sqrt(dx*dx + dy*dy)
+        return d if self._round is None else self._round(d)
+
+    def row(self, i):
+        """Distancias del nodo i a todos los nodos, usando el caché LRU.
+
+        Args:
+            i (int): Nodo origen.
+
+        Returns:
+            (np.array): Renglón i de la matriz de distancias (solo lectura).
+        """
+        i = int(i)
+        row = self._rows.get(i)
+        if row is not None:
+            self._rows.move_to_end(i)
+            self.hits += 1
+            return row
+        self.misses += 1
+        row = self.pairs(i, self._all)
+        row.flags.writeable = False
+        if self.cache_rows:
+            self._rows[i] = row
+            if len(self._rows) > self.cache_rows:
+                self._rows.popitem(last=False)
+        return row
+
+    def rows(self, idx):
+        """Distancias de varios nodos a todos los nodos.
+
+        Args:
+            idx (np.array): Nodos origen.
+
+        Returns:
+            (np.array): Arreglo (len(idx), n) con los renglones pedidos.
+        """
+        return self.pairs(np.asarray(idx)[:, None], self._all)
+
+    def matrix(self, chunk=256):
+        """Construye la matriz densa de distancias por bloques de renglones.
+
+        Args:
+            chunk (int, optional): Número de renglones calculados a la vez.
+            Default es 256.
+
+        Returns:
+            (np.array): Matriz de distancias de n x n.
+        """
+        out = np.empty(self.shape)
+        for lo in range(0, self.n, chunk):
+            out[lo:lo + chunk] = self.rows(self._all[lo:lo + chunk])
+        return out
+
+    def __array__(self, dtype=None):
+        out = self.matrix()
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            i, j = key
+            if isinstance(i, _SCALARS) and isinstance(j, _SCALARS):
+                return self.pair(i, j)
+            if not isinstance(i, slice) and not isinstance(j, slice):
+                # caso más común: pares de índices (arreglos)
+                d = self.pairs(i, j)
+                return float(d) if np.ndim(d) == 0 else d
+            if isinstance(j, slice):
+                # una columna completa (o un tramo) por cada índice de i
+                i = self._all[i] if isinstance(i, slice) else np.asarray(i)
+                return self.pairs(i[..., None], self._all[j])
+            j = np.asarray(j)
+            i = self._all[i].reshape((-1,) + (1,)*j.ndim)
+            return self.pairs(i, j)
+        if np.ndim(key) == 0 and not isinstance(key, slice):
+            return self.row(key)
+        return self.rows(self._all[key])
+
+
+class PackedSymmetric(object):
+    """Matriz simétrica de n x n guardada como su triángulo superior (con la
+    diagonal) en un arreglo de n(n+1)/2 elementos, renglón por renglón (el
+    mismo orden que M[np.triu_indices(n)]). Ocupa poco más de la mitad que la
+    matriz completa y se comporta como ella para los solvers (M[i], M[i, j]
+    y M[rows, cols] con índices vectorizados); las operaciones elemento a
+    elemento (evaporar, elevar a una potencia, ...) se hacen sobre data.
+
+    Args:
+        data (np.array): Triángulo superior empacado.
+        n (int, optional): Número de nodos. Default es None (se deduce del
+        tamaño de data).
+    """
+    ndim = 2
+
+    def __init__(self, data, n=None):
+        self.data = data
+        if n is None:
+            n = (math.isqrt(8*data.size + 1) - 1) // 2
+        if n*(n + 1)//2 != data.size:
+            raise ValueError(f'{data.size} elementos no forman un triángulo de n x n')
+        self.n = n
+        self.shape = (n, n)
+        self._all = np.arange(n)
+        # posición de la diagonal de cada renglón dentro de data
+        self._off = self._all*n - self._all*(self._all - 1)//2
+        self._offl = self._off.tolist()
+
+    @classmethod
+    def from_dense(cls, M, dtype=np.float64):
+        """Empaca el triángulo superior de una matriz simétrica, renglón por
+        renglón para no crear copias de n x n.
+
+        Args:
+            M (np.array or CoordDistance): Matriz simétrica de n x n.
+            dtype (np.dtype, optional): Tipo de dato de data. Default es np.float64.
+
+        Returns:
+            (PackedSymmetric): Matriz empacada.
+        """
+        n = M.shape[0]
+        packed = cls(np.empty(n*(n + 1)//2, dtype=dtype), n)
+        for i, off in enumerate(packed._offl):
+            packed.data[off:off + n - i] = M[i, i:]
+        return packed
+
+    def __reduce__(self):
+        # los índices de la diagonal se recalculan en el otro proceso
+        return (PackedSymmetric, (self.data, self.n))
+
+    def like(self, data):
+        """Matriz empacada del mismo tamaño con otros datos (p. ej. eta^beta a
+        partir de eta, o un bloque de memoria compartida).
+
+        Args:
+            data (np.array): Triángulo superior empacado.
+
+        Returns:
+            (PackedSymmetric): Matriz empacada sobre data.
+        """
+        return PackedSymmetric(data, self.n)
+
+    def copy(self):
+        """Copia de la matriz con sus propios datos.
+        """
+        return self.like(self.data.copy())
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    @property
+    def diagonal(self):
+        """Posiciones de la diagonal dentro de data.
+        """
+        return self._off
+
+    @property
+    def T(self):
+        """Transpuesta (la matriz es simétrica).
+        """
+        return self
+
+    def __len__(self):
+        return self.n
+
+    def pair(self, i, j):
+        """Elemento (i, j) de la matriz.
+
+        Args:
+            i (int): Renglón.
+            j (int): Columna.
+
+        Returns:
+            (float): Valor del elemento.
+        """
+        if i > j:
+            i, j = j, i
+        return self.data[self._offl[i] + j - i]
+
+    def index(self, i, j):
+        """Posiciones de los elementos (i, j) dentro de data, con broadcasting
+        de numpy. (i, j) y (j, i) comparten posición.
+
+        Args:
+            i (int or np.array): Renglones.
+            j (int or np.array): Columnas.
+
+        Returns:
+            (np.array): Posiciones con la forma de broadcast de i y j.
+        """
+        i = np.asarray(i, dtype=np.intp)
+        j = np.asarray(j, dtype=np.intp)
+        lo = np.minimum(i, j)
+        return self._off[lo] + np.maximum(i, j) - lo
+
+    def pairs(self, i, j):
+        """Elementos (i, j) de la matriz, con broadcasting de numpy.
+
+        Args:
+            i (int or np.array): Renglones.
+            j (int or np.array): Columnas.
+
+        Returns:
+            (np.array): Valores con la forma de broadcast de i y j.
+        """
+        return self.data[self.index(i, j)]
+
+    def row(self, i):
+        """Renglón i de la matriz.
+
+        Args:
+            i (int): Renglón.
+
+        Returns:
+            (np.array): Copia del renglón i.
+        """
+        i = int(i)
+        off = self._offl[i]
+        return np.concatenate((self.data[self._off[:i] + i - self._all[:i]],
+                               self.data[off:off + self.n - i]))
+
+    def rows(self, idx):
+        """Varios renglones de la matriz.
+
+        Args:
+            idx (np.array): Renglones.
+
+        Returns:
+            (np.array): Arreglo (len(idx), n) con los renglones pedidos.
+        """
+        return self.pairs(np.asarray(idx)[:, None], self._all)
+
+    def matrix(self):
+        """Construye la matriz densa.
+
+        Returns:
+            (np.array): Matriz de n x n.
+        """
+        out = np.empty(self.shape, dtype=self.dtype)
+        for i, off in enumerate(self._offl):
+            out[i, i:] = self.data[off:off + self.n - i]
+            out[i:, i] = out[i, i:]
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.matrix()
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            i, j = key
+            if isinstance(i, _SCALARS) and isinstance(j, _SCALARS):
+                return self.pair(i, j)
+            if not isinstance(i, slice) and not isinstance(j, slice):
+                d = self.pairs(i, j)
+                return d[()] if d.ndim == 0 else d
+            if isinstance(j, slice):
+                i = self._all[i] if isinstance(i, slice) else np.asarray(i)
+                return self.pairs(i[..., None], self._all[j])
+            j = np.asarray(j)
+            i = self._all[i].reshape((-1,) + (1,)*j.ndim)
+            return self.pairs(i, j)
+        if np.ndim(key) == 0 and not isinstance(key, slice):
+            return self.row(key)
+        return self.rows(self._all[key])
@@ -0,0 +1,362 @@
+import numpy as np
+from .pheromone import init_eta
+from .distance import CoordDistance, PackedSymmetric
+
+
+class TSPInstance(object):
+    """Instancia compilada de un problema TSP. Se construye una sola vez (desde
+    un grafo, una matriz de distancias, coordenadas o un archivo TSPLIB) y
+    guarda todo lo que los solvers necesitan sin volver a recorrer el grafo:
+    el mapeo entre etiquetas de nodos e índices, la matriz de distancias
+    contigua, eta, eta^beta y las listas de vecinos candidatos.
+
+    Con una CoordDistance como dist la instancia no guarda la matriz de
+    distancias; la matriz de adyacencia y eta se construyen solo si algún
+    solver las pide.
+
+    Con packed (o una PackedSymmetric como dist) la matriz de distancias, la
+    de adyacencia, eta y eta^beta se guardan como triángulo superior; ver
+    compact.
+
+    Args:
+        dist (np.array, CoordDistance or PackedSymmetric): Matriz de distancias
+        entre nodos.
+        nodes (lst, optional): Etiquetas de los nodos en el orden de dist.
+        Default es None (0, ..., n-1).
+        adj (np.array, optional): Matriz booleana de trayectorias existentes.
+        Default es None (toda distancia positiva fuera de la diagonal).
+        coords (np.array, optional): Coordenadas (n, 2) de los nodos.
+        graph (networkx graph, optional): Grafo de origen, usado para graficar.
+        dtype (np.dtype, optional): Tipo de dato de las distancias, eta y
+        eta^beta. Default es np.float64.
+        packed (bool, optional): Guarda las matrices simétricas empacadas como
+        PackedSymmetric. Default es False.
+    """
+    def __init__(self, dist, nodes=None, adj=None, coords=None, graph=None,
+                 dtype=np.float64, packed=False):
+        implicit = isinstance(dist, CoordDistance)
+        self.dtype = np.dtype(dtype)
+        if implicit:
+            self.dist = dist
+            coords = dist.coords if coords is None else coords
+        elif isinstance(dist, PackedSymmetric):
+            self.dist = dist if dist.dtype == self.dtype else dist.like(dist.data.astype(self.dtype))
+            packed = True
+        elif packed:
+            dist = np.asarray(dist)
+            if not np.allclose(dist, dist.T):
+                raise ValueError('Solo las distancias simétricas se pueden empacar')
+            self.dist = PackedSymmetric.from_dense(dist, self.dtype)
+        else:
+            self.dist = np.ascontiguousarray(dist, dtype=self.dtype)
+        self.packed = packed
+        self.n = self.dist.shape[0]
+        self.nodes = list(range(self.n)) if nodes is None else list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self._identity = self.nodes == list(range(self.n))
+        if packed and adj is not None:
+            if not isinstance(adj, PackedSymmetric):
+                adj = PackedSymmetric.from_dense(adj, bool)
+            adj.data[adj.diagonal] = False
+        elif adj is not None:
+            adj = np.array(adj, dtype=bool)
+            np.fill_diagonal(adj, False)
+        self._adj = adj
+        self.coords = None if coords is None else np.asarray(coords, dtype=np.float64)
+        self.graph = graph
+        self.symmetric = implicit or packed or bool(np.allclose(self.dist, self.dist.T))
+        self._eta = None
+        self._eta_beta = {}
+        self._candidates = {}
+        self._compact = {}
+
+    def __getstate__(self):
+        # al enviarse a otro proceso no viajan el grafo ni los cachés derivados
+        state = self.__dict__.copy()
+        state.update(graph=None, _eta=None, _eta_beta={}, _candidates={}, _compact={})
+        return state
+
+    @classmethod
+    def from_graph(cls, G):
+        """Compila una instancia a partir de un grafo de networkx.
+
+        Args:
+            G (networkx graph): Grafo con relaciones asociadas entre nodos
+
+        Returns:
+            (TSPInstance): Instancia compilada.
+        """
+        from .utils import graph_to_mat
+
+        dist, adj = graph_to_mat(G)
+        return cls(dist, nodes=list(G.nodes), adj=adj, graph=G)
+
+    @classmethod
+    def from_matrix(cls, dist):
+        """Compila una instancia a partir de una matriz de distancias.
+
+        Args:
+            dist (np.array): Matriz de distancias entre nodos.
+
+        Returns:
+            (TSPInstance): Instancia compilada.
+        """
+        return cls(dist)
+
+    @classmethod
+    def from_coords(cls, coords, nodes=None, kind=None, dense=True, cache_rows=1024):
+        """Compila una instancia a partir de coordenadas, con distancia euclidiana.
+
+        Args:
+            coords (np.array): Coordenadas (n, 2) de los nodos.
+            nodes (lst, optional): Etiquetas de los nodos. Default es None.
+            kind (str, optional): Redondeo de TSPLIB ('EUC_2D' o 'CEIL_2D').
+            Default es None (distancia exacta).
+            dense (bool, optional): Construye la matriz de distancias. Si es
+            False las distancias se calculan bajo demanda con una
+            CoordDistance. Default es True.
+            cache_rows (int, optional): Renglones en el caché LRU de la
+            CoordDistance (solo si dense es False). Default es 1024.
+
+        Returns:
+            (TSPInstance): Instancia compilada.
+        """
+        dist = CoordDistance(coords, kind, cache_rows=0 if dense else cache_rows)
+        if dense:
+            dist = dist.matrix()
+        return cls(dist, nodes=nodes, coords=coords)
+
+    @classmethod
+    def from_tsplib(cls, path, cache=True, dense=True):
+        """Compila una instancia a partir de un archivo .txt (matriz de
+        distancias) o .tsp (TSPLIB). Los archivos EXPLICIT, EUC_2D y CEIL_2D se
+        leen con el parser (y caché) de ant_colony.tsplib; el resto con tsplib95.
+
+        Args:
+            path (str): Ruta del archivo.
+            cache (bool, optional): Usa el caché binario del archivo .tsp.
+            Default es True.
+            dense (bool, optional): Construye la matriz de distancias de los
+            archivos con coordenadas (EUC_2D, CEIL_2D). Si es False se usa una
+            CoordDistance. Default es True.
+
+        Returns:
+            (TSPInstance): Instancia compilada.
+        """
+        if path.endswith('.txt'):
+            return cls.from_matrix(np.loadtxt(path))
+
+        from .tsplib import load_tsplib
+
+        header, nodes, data = load_tsplib(path, cache)
+        kind = header.get('EDGE_WEIGHT_TYPE', '').upper()
+        if kind == 'EXPLICIT':
+            return cls(data, nodes=nodes.tolist())
+        if kind in ('EUC_2D', 'CEIL_2D'):
+            return cls.from_coords(data, nodes=nodes.tolist(), kind=kind, dense=dense)
+
+        import tsplib95
+
+        return cls.from_graph(tsplib95.load(path).get_graph())
+
+    def compact(self, dtype=np.float32, packed=None):
+        """Instancia equivalente en modo compacto, para instancias grandes en
+        las que la memoria limita el tamaño: las distancias, eta y eta^beta se
+        guardan en float32 y, si las distancias son simétricas, como triángulo
+        superior empacado (PackedSymmetric); con el almacén de feromonas de
+        colony esto reduce la memoria de las matrices a poco más de un cuarto.
+        Las distancias implícitas (CoordDistance) no cambian.
+
+        Costo en exactitud: float32 conserva unos 7 dígitos significativos. Las
+        distancias enteras menores a 2**24 (las de TSPLIB) se representan
+        exactamente y las longitudes de los recorridos se siguen sumando en
+        float64, así que no cambian; con distancias reales cada tramo se
+        redondea con un error relativo de hasta 6e-8. eta se expresa
+        relativa a la distancia media (eta = d_media/d), lo que no cambia la
+        ruleta pero evita que eta^beta salga del rango de float32; aun así,
+        con alpha grande los niveles de tau muy bajos pueden redondearse a
+        cero. Leer un elemento empacado cuesta algo más de CPU que en la
+        matriz completa.
+
+        Args:
+            dtype (np.dtype, optional): Tipo de dato de las matrices. Default
+            es np.float32.
+            packed (bool, optional): Empaca las matrices simétricas. Default es
+            None (si las distancias son simétricas).
+
+        Returns:
+            (TSPInstance): Instancia compacta (se construye una sola vez).
+        """
+        packed = self.symmetric if packed is None else packed
+        key = (np.dtype(dtype), packed)
+        if key == (self.dtype, self.packed):
+            return self
+        if key not in self._compact:
+            instance = TSPInstance(self.dist, nodes=self.nodes, adj=self._adj,
+                                   coords=self.coords, graph=self.graph,
+                                   dtype=dtype, packed=packed)
+            # las listas de vecinos no dependen de la precisión
+            instance._candidates = self._candidates
+            self._compact[key] = instance
+        return self._compact[key]
+
+    def _packed_dist(self):
+        """Distancias empacadas (se construyen si son implícitas). No está
+        disponible para los usuarios.
+        """
+        if isinstance(self.dist, PackedSymmetric):
+            return self.dist
+        return PackedSymmetric.from_dense(self.dist, self.dtype)
+
+    @property
+    def adj(self):
+        """Matriz booleana de trayectorias existentes (toda distancia positiva
+        fuera de la diagonal, si no se indicó otra).
+        """
+        if self._adj is None and self.packed:
+            dist = self._packed_dist()
+            adj = dist.like(dist.data > 0)
+            adj.data[adj.diagonal] = False
+            self._adj = adj
+        elif self._adj is None:
+            adj = np.asarray(self.dist) > 0
+            np.fill_diagonal(adj, False)
+            self._adj = adj
+        return self._adj
+
+    @property
+    def eta(self):
+        """Atracción a priori (inversa de la distancia) de las trayectorias.
+        En float32 es relativa a la distancia media (ver compact).
+        """
+        if self._eta is None and self.packed:
+            dist, adj = self._packed_dist().data, self.adj.data
+            scale = float(dist[adj].mean()) if adj.any() else 1.0
+            self._eta = self.adj.like(init_eta(dist, adj, scale, self.dtype))
+        elif self._eta is None:
+            dist = np.asarray(self.dist)
+            scale = 1.0
+            if self.dtype != np.float64 and self.adj.any():
+                scale = float(dist[self.adj].mean())
+            self._eta = init_eta(dist, self.adj, scale, self.dtype)
+        return self._eta
+
+    def eta_beta(self, beta):
+        """Calcula (una sola vez por valor de beta) eta^beta.
+
+        Args:
+            beta (float): Factor de influencia de eta.
+
+        Returns:
+            (np.array): Matriz eta^beta.
+        """
+        if beta not in self._eta_beta:
+            if self.packed:
+                self._eta_beta[beta] = self.eta.like(self.eta.data**beta)
+            else:
+                self._eta_beta[beta] = self.eta**beta
+        return self._eta_beta[beta]
+
+    def candidates(self, k):
+        """Calcula (una sola vez por valor de k) las listas de los k vecinos
+        más cercanos de cada nodo.
+
+        Args:
+            k (int): Número de vecinos candidatos por nodo.
+
+        Returns:
+            (np.array): Arreglo (n, k) de int32, o None si k no reduce la búsqueda.
+        """
+        if not k or k >= self.n - 1:
+            return None
+        if k not in self._candidates:
+            from .candidates import candidate_lists, candidate_lists_coords
+
+            if self.coords is not None:
+                self._candidates[k] = candidate_lists_coords(self.coords, k)
+            else:
+                self._candidates[k] = candidate_lists(self.dist, k, self.adj)
+        return self._candidates[k]
+
+    def subsample(self, n, seed=1999):
+        """Instancia con n nodos elegidos al azar (mismo muestreo que
+        read_coord_data), que conservan sus etiquetas y coordenadas.
+
+        Args:
+            n (int): Número de nodos de la submuestra.
+            seed (int, optional): Semilla del muestreo. Default es 1999.
+
+        Returns:
+            (TSPInstance): Instancia con la matriz de distancias de la submuestra.
+        """
+        idx = np.random.RandomState(seed).choice(self.n, n, replace=False)
+        sub = np.ix_(idx, idx)
+        return TSPInstance(self.dist[sub], nodes=[self.nodes[i] for i in idx],
+                           adj=None if self._adj is None else self._adj[sub],
+                           coords=None if self.coords is None else self.coords[idx],
+                           dtype=self.dtype, packed=self.packed)
+
+    def index_of(self, node):
+        """Índice interno de un nodo.
+
+        Args:
+            node: Etiqueta del nodo.
+
+        Returns:
+            (int): Índice del nodo en las matrices de la instancia.
+        """
+        return self.index[node]
+
+    def labels(self, route):
+        """Convierte una ruta de índices internos a etiquetas de nodos.
+
+        Args:
+            route (np.array or lst): Ruta de índices.
+
+        Returns:
+            (lst): Ruta con las etiquetas de los nodos.
+        """
+        route = np.asarray(route).tolist()
+        if self._identity:
+            return route
+        return [self.nodes[i] for i in route]
+
+    def to_graph(self):
+        """Grafo de networkx de la instancia (se construye solo si no existe).
+
+        Returns:
+            (networkx graph): Grafo asociado a la matriz de distancias.
+        """
+        if self.graph is None:
+            import networkx as nx
+
+            G = nx.from_numpy_array(np.asarray(self.dist))
+            self.graph = nx.relabel_nodes(G, dict(enumerate(self.nodes)))
+        return self.graph
+
+
+def as_instance(G):
+    """Regresa la instancia compilada de G. Si G ya es una instancia se regresa
+    sin cambios, de modo que solves repetidos la reutilizan. Las matrices y
+    coordenadas se compilan directamente, sin pasar por networkx.
+
+    Args:
+        G (TSPInstance, networkx graph, np.array or str): Instancia, grafo,
+        matriz de distancias (n, n), coordenadas (n, 2) o ruta de un archivo
+        .txt/.tsp. Un arreglo cuadrado se interpreta como matriz de distancias.
+
+    Returns:
+        (TSPInstance): Instancia compilada.
+    """
+    if isinstance(G, TSPInstance):
+        return G
+    if isinstance(G, str):
+        return TSPInstance.from_tsplib(G)
+    if isinstance(G, (np.ndarray, list, tuple)):
+        arr = np.asarray(G, dtype=np.float64)
+        if arr.ndim == 2 and arr.shape[0] == arr.shape[1]:
+            return TSPInstance.from_matrix(arr)
+        if arr.ndim == 2 and arr.shape[1] == 2:
+            return TSPInstance.from_coords(arr)
+        raise ValueError(f'Se esperaba una matriz (n, n) o coordenadas (n, 2), no {arr.shape}')
+    return TSPInstance.from_graph(G)
@@ -0,0 +1,168 @@
+import time
+import numpy as np
+from multiprocessing import Pipe, Process, cpu_count
+from .aco_tsp_oo import colony
+from .instance import as_instance
+
+
+class colony_islands(object):
+    """Modelo de islas: n_islands colonias independientes, cada una con su
+    propia matriz de feromonas y en su propio proceso. Las colonias solo se
+    sincronizan cada migrate_every iteraciones para intercambiar información:
+    con migration='best' cada colonia recibe la mejor ruta global (deposita
+    feromona sobre ella y la adopta si es mejor que la propia); con
+    migration='blend' además se mezcla su tau con el promedio de todas las
+    colonias. Al final se recolecta la mejor ruta global.
+
+    Args:
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2).
+        init_node (int): Nodo inicial del recorrido.
+        n_islands (int, optional): Número de colonias (procesos). Default es
+        None (todos los cores).
+        max_iter (int, optional): Iteraciones de cada colonia. Default es 100.
+        migrate_every (int, optional): Iteraciones entre migraciones. Default es 10.
+        migration (str, optional): 'best' o 'blend'. Default es 'best'.
+        blend (float, optional): Peso del tau promedio al mezclar feromonas
+        (migration='blend'). Default es .5.
+        time_limit (float, optional): Tiempo máximo en segundos; no se inicia
+        una época que terminaría después del límite. Default es None.
+        seed (int, optional): Semilla de las colonias. Default es None.
+        verbose (bool, optional): Imprime la mejor distancia en cada migración.
+        Default es False.
+        **kwargs: Parámetros restantes de cada colonia (n_ants, alpha, beta,
+        rho, mmas, patience, ...).
+    """
+    def __init__(self, G, init_node,
+                 n_islands=None,
+                 max_iter=100,
+                 migrate_every=10,
+                 migration='best',
+                 blend=.5,
+                 time_limit=None,
+                 seed=None,
+                 verbose=False,
+                 **kwargs):
+        if migration not in ('best', 'blend'):
+            raise ValueError(f"Migración no reconocida: {migration}")
+        self.instance = as_instance(G)
+        self.init_node = init_node
+        self.n_islands = n_islands or cpu_count()
+        self.max_iter = max_iter
+        self.migrate_every = migrate_every
+        self.migration = migration
+        self.blend = blend
+        self.time_limit = time_limit
+        self.seed = seed
+        self.verbose = verbose
+        self.kwargs = kwargs
+        self.best_route = []
+        self.best_dist = float('inf')
+        self.best_tour = None
+        self.island_dists = []
+        self.n_iter = 0
+        self.stop_reason = None
+        self.elapsed = 0.0
+
+    def solve_tsp(self):
+        """Resuelve el problema TSP con todas las islas.
+        """
+        start = time.perf_counter()
+        seeds = np.random.SeedSequence(self.seed).generate_state(self.n_islands)
+        conns, procs = [], []
+        try:
+            for i in range(self.n_islands):
+                parent, child = Pipe()
+                proc = Process(target=_island_worker,
+                               args=(child, self.instance, self.init_node,
+                                     int(seeds[i]), self.kwargs),
+                               daemon=True)
+                proc.start()
+                child.close()
+                conns.append(parent)
+                procs.append(proc)
+
+            active = list(range(self.n_islands))
+            self.island_dists = [float('inf')]*self.n_islands
+            self.stop_reason = 'max_iter'
+            while self.n_iter < self.max_iter:
+                tic = time.perf_counter()
+                every = min(self.migrate_every, self.max_iter - self.n_iter)
+                migrant = None if self.best_tour is None else (self.best_tour, self.best_dist)
+                for i in active:
+                    conns[i].send(('run', (every, migrant)))
+                for i in list(active):
+                    tour, dist, reason = conns[i].recv()
+                    self.island_dists[i] = dist
+                    if dist < self.best_dist:
+                        self.best_dist, self.best_tour = dist, tour
+                    if reason not in ('max_iter', 'cancelled'):
+                        # patience / diversity: the island has converged
+                        active.remove(i)
+                self.n_iter += every
+                if self.migration == 'blend' and len(active) > 1:
+                    self._blend([conns[i] for i in active])
+
+                if self.verbose:
+                    print(f'iter: {self.n_iter} / {self.max_iter} - dist: {round(self.best_dist, 2)}')
+
+                toc = time.perf_counter()
+                if not active:
+                    self.stop_reason = 'converged'
+                    break
+                if (self.time_limit is not None and self.n_iter < self.max_iter and
+                        (toc - start) + (toc - tic) > self.time_limit):
+                    self.stop_reason = 'time_limit'
+                    break
+            for conn in conns:
+                conn.send(('close', None))
+        finally:
+            for conn in conns:
+                conn.close()
+            for proc in procs:
+                proc.join(timeout=5)
+                if proc.is_alive():
+                    proc.terminate()
+            self.elapsed = time.perf_counter() - start
+
+        if self.best_tour is not None:
+            self.best_route = self.instance.labels(self.best_tour)
+
+    def _blend(self, conns):
+        """Mezcla el tau de cada colonia activa con el promedio de todas. No
+        está disponible para los usuarios.
+        """
+        for conn in conns:
+            conn.send(('tau', None))
+        mean = sum(conn.recv() for conn in conns) / len(conns)
+        for conn in conns:
+            conn.send(('blend', (mean, self.blend)))
+
+
+def _island_worker(conn, instance, init_node, seed, kwargs):
+    """Proceso de una isla: mantiene su colonia y atiende los comandos del
+    proceso principal. No está disponible para los usuarios.
+    """
+    # the island owns its iteration budget (given per epoch) and its seed
+    kwargs = {k: v for k, v in kwargs.items() if k not in ('max_iter', 'seed')}
+    colony_ = colony(instance, init_node, max_iter=0, seed=seed, **kwargs)
+    while True:
+        cmd, arg = conn.recv()
+        if cmd == 'run':
+            every, migrant = arg
+            if migrant is not None:
+                colony_.migrate(*migrant)
+            colony_.run(every)
+            conn.send((colony_.best_tour, colony_.best_dist, colony_.stop_reason))
+        elif cmd == 'tau':
+            conn.send(colony_.store.tau_data)
+        elif cmd == 'blend':
+            mean, w = arg
+            tau = colony_.store.tau_data
+            tau *= 1 - w
+            tau += w*mean
+            colony_.store.clamp()
+        else:
+            break
+    conn.close()
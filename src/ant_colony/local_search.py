@@ -0,0 +1,196 @@
+import numpy as np
+from collections import deque
+
+
+def local_search(route, dist, candidates, or_opt=True, eps=1e-9):
+    """Mejora una ruta con 2-opt y Or-opt sobre listas de vecinos candidatos y
+    bits de no mirar (don't-look bits). Para cada nodo activo se evalúan de
+    forma vectorizada todos los movimientos con sus candidatos y se aplica el
+    de mayor ganancia; los extremos de los tramos modificados se reactivan.
+    Supone distancias simétricas.
+
+    Args:
+        route (np.array or lst): Ruta con regreso al origen.
+        dist (np.array): Matriz de distancias entre nodos.
+        candidates (np.array): Arreglo (n, k) con los vecinos candidatos de cada nodo.
+        or_opt (bool, optional): Evalúa también movimientos Or-opt (reubicar
+        tramos de 1 a 3 nodos). Default es True.
+        eps (float, optional): Ganancia mínima para aceptar un movimiento.
+        Default es 1e-9.
+
+    Returns:
+        (np.array, float): Ruta mejorada (con el mismo origen y regreso al
+        origen) y su distancia.
+    """
+    route = np.asarray(route)
+    if dist.dtype != np.float64:
+        dist = _Float64(dist)
+    start = route[0]
+    tour = route[:-1].astype(np.intp)
+    n = tour.size
+    if n >= 5:
+        pos = np.empty(n, dtype=np.intp)
+        pos[tour] = np.arange(n)
+        queued = np.ones(n, dtype=bool)
+        queue = deque(tour.tolist())
+        while queue:
+            a = queue.popleft()
+            queued[a] = False
+            touched = _two_opt_move(a, tour, pos, dist, candidates, eps)
+            if touched is None and or_opt:
+                touched = _or_opt_move(a, tour, pos, dist, candidates, eps)
+                if touched is not None:
+                    pos[tour] = np.arange(n)
+            if touched is None:
+                continue
+            for c in touched:
+                if not queued[c]:
+                    queued[c] = True
+                    queue.append(c)
+        tour = np.roll(tour, -int(pos[start]))
+
+    closed = np.append(tour, start).astype(route.dtype)
+    return closed, float(dist[closed[:-1], closed[1:]].sum())
+
+
+def improve_tours(tours, lengths, dist, candidates, mode='best'):
+    """Aplica la búsqueda local a los recorridos de una iteración. Los
+    arreglos se modifican en su lugar.
+
+    Args:
+        tours (np.array): Recorridos (hormigas x n+1) con regreso al origen.
+        lengths (np.array): Distancias de los recorridos.
+        dist (np.array): Matriz de distancias entre nodos.
+        candidates (np.array): Vecinos candidatos de cada nodo.
+        mode (str, optional): 'best' mejora solo el mejor recorrido de la
+        iteración y 'all' mejora todos. Default es 'best'.
+
+    Returns:
+        (np.array, np.array): Recorridos y distancias mejorados.
+    """
+    if mode == 'best':
+        idx = [int(np.argmin(lengths))]
+    elif mode == 'all':
+        idx = range(len(lengths))
+    else:
+        raise ValueError(f"Modo de búsqueda local no reconocido: {mode}")
+    for i in idx:
+        if np.isfinite(lengths[i]):
+            tours[i], lengths[i] = local_search(tours[i], dist, candidates)
+    return tours, lengths
+
+
+class _Float64(object):
+    """Lee en float64 una matriz de distancias de menor precisión, para que
+    las ganancias de los movimientos no acumulen el redondeo de float32 (y
+    no se acepten movimientos que no mejoran). No está disponible para los
+    usuarios.
+    """
+    __slots__ = ('dist',)
+
+    def __init__(self, dist):
+        self.dist = dist
+
+    def __getitem__(self, key):
+        return np.float64(self.dist[key])
+
+
+def _reverse(tour, pos, i, j):
+    """Invierte el tramo cíclico de posiciones i..j (o su complemento, si es
+    más corto). No está disponible para los usuarios.
+    """
+    n = tour.size
+    length = (j - i) % n + 1
+    if 2*length > n:
+        i, j, length = (j + 1) % n, (i - 1) % n, n - length
+    idx = (i + np.arange(length)) % n
+    seg = tour[idx][::-1]
+    tour[idx] = seg
+    pos[seg] = idx
+
+
+def _two_opt_move(a, tour, pos, dist, candidates, eps):
+    """Aplica el mejor movimiento 2-opt que reconecta a con alguno de sus
+    candidatos. No está disponible para los usuarios.
+
+    Returns:
+        (lst): Nodos cuyos tramos cambiaron, o None si no hubo mejora.
+    """
+    n = tour.size
+    i = pos[a]
+    c = candidates[a]
+    pc = pos[c]
+    row = dist[a]
+    d_ac = row[c]
+    # sucesores: (a, b) y (c, d) -> (a, c) y (b, d)
+    b = tour[(i + 1) % n]
+    d = tour[(pc + 1) % n]
+    delta_s = d_ac + dist[b, d] - row[b] - dist[c, d]
+    # predecesores: (b, a) y (d, c) -> (c, a) y (d, b)
+    bp = tour[(i - 1) % n]
+    dp = tour[(pc - 1) % n]
+    delta_p = d_ac + dist[bp, dp] - row[bp] - dist[dp, c]
+
+    ks, kp = int(np.argmin(delta_s)), int(np.argmin(delta_p))
+    if delta_s[ks] <= delta_p[kp]:
+        if delta_s[ks] >= -eps:
+            return None
+        cc, dd = int(c[ks]), int(d[ks])
+        _reverse(tour, pos, pos[b], pos[cc])
+        return [a, b, cc, dd]
+    if delta_p[kp] >= -eps:
+        return None
+    cc, dd = int(c[kp]), int(dp[kp])
+    _reverse(tour, pos, pos[cc], pos[bp])
+    return [a, bp, cc, dd]
+
+
+def _or_opt_move(a, tour, pos, dist, candidates, eps):
+    """Aplica el mejor movimiento Or-opt que reubica el tramo de 1 a 3 nodos
+    que empieza en a junto a alguno de los candidatos de sus extremos. No está
+    disponible para los usuarios.
+
+    Returns:
+        (lst): Nodos cuyos tramos cambiaron, o None si no hubo mejora.
+    """
+    n = tour.size
+    i = pos[a]
+    # the three segment lengths are evaluated together, one row each
+    lengths = np.arange(1, min(3, n - 3) + 1)
+    s1 = a
+    s2 = tour[(i + lengths - 1) % n]
+    p = tour[(i - 1) % n]
+    nx = tour[(i + lengths) % n]
+    gain = dist[p, s1] + dist[s2, nx] - dist[p, nx]
+
+    # duplicated candidates are harmless: they only repeat a delta
+    k = candidates.shape[1]
+    c = np.empty((lengths.size, 2*k), dtype=candidates.dtype)
+    c[:, :k] = candidates[s1]
+    c[:, k:] = candidates[s2]
+    pc = pos[c]
+    outside = (pc - i) % n >= lengths[:, None]
+    # insertar entre (c, succ c) o entre (pred c, c)
+    e = tour[(pc + 1) % n]
+    f = tour[(pc - 1) % n]
+    s2_, nx_ = s2[:, None], nx[:, None]
+    # symmetric distances: each edge to the segment ends is read once
+    row = dist[s1]
+    d_c1, d_c2 = row[c], dist[c, s2_]
+    add_e = np.minimum(d_c1 + dist[s2_, e], d_c2 + row[e]) - dist[c, e]
+    add_f = np.minimum(dist[f, s2_] + d_c1, row[f] + d_c2) - dist[f, c]
+    delta = np.concatenate((np.where(outside & (c != p), add_e, np.inf),
+                            np.where(outside & (c != nx_), add_f, np.inf)), axis=1) - gain[:, None]
+    r, j = divmod(int(np.argmin(delta)), 4*k)
+    if not delta[r, j] < -eps:
+        return None
+    left, right = (int(c[r, j]), int(e[r, j])) if j < 2*k else (int(f[r, j - 2*k]), int(c[r, j - 2*k]))
+    seg_idx = (i + np.arange(lengths[r])) % n
+    touched = [s1, int(s2[r]), int(p), int(nx[r]), left, right]
+    seg = tour[seg_idx]
+    rest = np.delete(tour, seg_idx)
+    q = int(np.flatnonzero(rest == left)[0])
+    if dist[left, seg[-1]] + dist[seg[0], right] < dist[left, seg[0]] + dist[seg[-1], right]:
+        seg = seg[::-1]
+    tour[:] = np.concatenate((rest[:q + 1], seg, rest[q + 1:]))
+    return touched
@@ -1,7 +1,13 @@
+import math
+import os
+import shutil
+import tempfile
 import time
 import optuna
 from .aco_tsp_oo import colony, colony_multiw
-from multiprocessing import cpu_count
+from .instance import as_instance
+from .utils import assign_ants_threats
+from multiprocessing import Process, cpu_count
 
 def load_params(file):
     """Carga los mejores parámetros de un estudio previo.
@@ -17,63 +23,190 @@ def load_params(file):
     study = optuna.load_study(study_name='optimize_aco', storage=sq_path)
     return study.best_trial.params
 
-def optim_h_params(G, init_node, trials, save=False):
-    """Genera estudio de optimización para buscar los mejores hiper-parámetros del algoritmo.
+def optim_h_params(G, init_node, trials, save=False, n_jobs=1, cores=None, pruner=None):
+    """Genera estudio de optimización para buscar los mejores hiper-parámetros del algoritmo.
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos.
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2).
         init_node (int): Nodo inicial del recorrido.
         trials (int): Numero de intentos para hacer el muestreo. 
         save (bool, optional): Se especifica si se quiere guardar el estudio en disco. Default es False.
+        n_jobs (int, optional): Número de procesos que ejecutan intentos en
+        paralelo sobre el mismo almacenamiento sqlite. Default es 1.
+        cores (int, optional): Presupuesto de cores, repartido entre los
+        n_jobs intentos simultáneos y los workers de cada colonia. Default es
+        None (todos los cores).
+        pruner (str, optional): Poda de intentos con la distancia reportada en
+        cada iteración: 'median', 'hyperband' o None. Default es None (sin poda).
 
     Returns:
-        [dict]: Diccionario con la información del estudio de optimización
+        [dict]: Diccionario con la información del estudio de optimización
     """
-    objective = Objective_mp(G, init_node)
-    if save:
-        study = optuna.create_study(study_name='optimize_aco',
-                                    direction="minimize", 
-                                    storage='sqlite:///best_hiper_params.db', 
-                                    load_if_exists=True)
-        
-    else:
-        study = optuna.create_study(study_name='optimize_aco', direction="minimize")
-
-    study.optimize(objective, n_trials=trials)
+    cores = cores or cpu_count()
+    n_jobs = max(1, min(n_jobs, cores))
+    objective = Objective_mp(G, init_node, n_workers=max(1, cores // n_jobs))
+    return _run_study(objective, trials, save, n_jobs, pruner)
 
-    if save:
-        print(f'Hyper-parameters saved in ./best_hiper_params.db')
-
-    return study.best_trial
-
-def optim_h_params_mp(G, init_node, trials, save=False):
-    """Genera estudio de optimización para buscar los mejores hiper-parámetros del algoritmo.
+def optim_h_params_mp(G, init_node, trials, save=False, n_jobs=1, cores=None, pruner=None):
+    """Genera estudio de optimización para buscar los mejores hiper-parámetros del algoritmo.
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos.
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2).
         init_node (int): Nodo inicial del recorrido.
         trials (int): Numero de intentos para hacer el muestreo. 
         save (bool, optional): Se especifica si se quiere guardar el estudio en disco. Default es False.
+        n_jobs (int, optional): Número de procesos que ejecutan intentos en
+        paralelo sobre el mismo almacenamiento sqlite. Default es 1.
+        cores (int, optional): Máximo de procesos simultáneos. Default es None
+        (todos los cores).
+        pruner (str, optional): Poda de intentos con la distancia reportada en
+        cada iteración: 'median', 'hyperband' o None. Default es None (sin poda).
 
     Returns:
-        [dict]: Diccionario con la información del estudio de optimización
+        [dict]: Diccionario con la información del estudio de optimización
     """
+    cores = cores or cpu_count()
     objective = Objective(G, init_node)
-    if save:
+    return _run_study(objective, trials, save, max(1, min(n_jobs, cores)), pruner)
+
+def optim_h_params_sh(G, init_node, n_candidates=27, sizes=(50, 200, None), eta=3,
+                      seed=1999, n_workers=1, verbose=False):
+    """Búsqueda de hiper-parámetros multi-fidelidad por successive halving sobre
+    el tamaño de la instancia: todos los candidatos se evalúan en una
+    submuestra pequeña de nodos y solo la mejor 1/eta parte pasa a la
+    siguiente submuestra, hasta llegar a la instancia completa.
+
+    Args:
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2).
+        init_node (int): Nodo inicial del recorrido (en las submuestras que no
+        lo incluyen se usa su primer nodo).
+        n_candidates (int, optional): Número de candidatos iniciales. Default es 27.
+        sizes (tuple, optional): Número de nodos de cada fidelidad; None es la
+        instancia completa. Default es (50, 200, None).
+        eta (int, optional): Factor de reducción de candidatos entre
+        fidelidades. Default es 3.
+        seed (int, optional): Semilla de las submuestras y del muestreo de
+        candidatos. Default es 1999.
+        n_workers (int, optional): Workers de cada colonia; con más de uno se
+        usa colony_multiw. Default es 1.
+        verbose (bool, optional): Imprime el resultado de cada fidelidad.
+        Default es False.
+
+    Returns:
+        [dict]: Por fidelidad (número de nodos), los mejores parámetros, su
+        valor objetivo y el número de candidatos evaluados.
+    """
+    instance = as_instance(G)
+    study = optuna.create_study(direction="minimize", 
+                                sampler=optuna.samplers.RandomSampler(seed=seed))
+    candidates = [sample_params(study.ask()) for _ in range(n_candidates)]
+    results = {}
+    for r, size in enumerate(sizes):
+        if size is None or size >= instance.n:
+            sub = instance
+        else:
+            sub = instance.subsample(size, seed)
+        init = init_node if init_node in sub.index else sub.nodes[0]
+        if n_workers > 1:
+            objective = Objective_mp(sub, init, n_workers=n_workers)
+        else:
+            objective = Objective(sub, init)
+        values = [objective(optuna.trial.FixedTrial(params)) for params in candidates]
+        order = sorted(range(len(candidates)), key=values.__getitem__)
+        results[sub.n] = {'params': candidates[order[0]], 
+                          'value': values[order[0]],
+                          'n_candidates': len(candidates)}
+        if verbose:
+            print(f'fidelity: {sub.n} nodes - candidates: {len(candidates)} - best: {values[order[0]]}')
+        if sub is instance:
+            break
+        keep = max(1, len(candidates) // eta)
+        candidates = [candidates[i] for i in order[:keep]]
+    return results
+
+def _run_study(objective, trials, save, n_jobs=1, pruner=None):
+    """Crea (o carga) el estudio y ejecuta los intentos, en este proceso o en
+    n_jobs procesos que comparten el almacenamiento sqlite. Sin save, los
+    procesos usan una base temporal que se borra al terminar. No está
+    disponible para los usuarios.
+
+    Returns:
+        [optuna trial]: Mejor intento del estudio.
+    """
+    storage = 'sqlite:///best_hiper_params.db' if save else None
+    tmp_dir = None
+    if n_jobs > 1 and storage is None:
+        # the worker processes need a storage they can all reach
+        tmp_dir = tempfile.mkdtemp()
+        storage = 'sqlite:///' + os.path.join(tmp_dir, 'study.db')
+    try:
         study = optuna.create_study(study_name='optimize_aco',
                                     direction="minimize", 
-                                    storage='sqlite:///best_hiper_params.db', 
+                                    storage=storage, 
+                                    pruner=_make_pruner(pruner),
                                     load_if_exists=True)
-        
-    else:
-        study = optuna.create_study(study_name='optimize_aco', direction="minimize")
-
-    study.optimize(objective, n_trials=trials)
+        if n_jobs > 1:
+            procs = [Process(target=_study_worker, args=(storage, objective, n[0], pruner))
+                     for n in assign_ants_threats(trials, n_jobs)]
+            for proc in procs:
+                proc.start()
+            for proc in procs:
+                proc.join()
+            failed = [(k, proc.exitcode) for k, proc in enumerate(procs) if proc.exitcode]
+            if failed:
+                k, code = failed[0]
+                raise RuntimeError(f'El worker {k} ({procs[k].name}) del estudio terminó '
+                                   f'con código {code}; {len(failed)} de {len(procs)} fallaron')
+        else:
+            study.optimize(objective, n_trials=trials)
+        best = study.best_trial
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
     if save:
         print(f'Hyper-parameters saved in ./best_hiper_params.db')
 
-    return study.best_trial
+    return best
+
+def _study_worker(storage, objective, n_trials, pruner=None):
+    """Proceso que ejecuta n_trials intentos del estudio compartido. No está
+    disponible para los usuarios.
+    """
+    study = optuna.load_study(study_name='optimize_aco', storage=storage,
+                              pruner=_make_pruner(pruner))
+    study.optimize(objective, n_trials=n_trials)
+
+def _make_pruner(pruner):
+    """Crea el pruner de optuna a partir de su nombre. No está disponible para
+    los usuarios.
+    """
+    if pruner is None:
+        return optuna.pruners.NopPruner()
+    if pruner == 'median':
+        return optuna.pruners.MedianPruner(n_warmup_steps=5)
+    if pruner == 'hyperband':
+        return optuna.pruners.HyperbandPruner()
+    raise ValueError(f"Pruner no reconocido: {pruner}")
+
+def _pruning_callback(trial, start):
+    """Callback de solve_tsp que reporta a optuna el objetivo parcial (tiempo +
+    distancia^2) en cada iteración y detiene la colonia si el intento se poda.
+    No está disponible para los usuarios.
+    """
+    def callback(progress):
+        if math.isfinite(progress.best_dist):
+            total_time = (time.time() - start) / 60
+            trial.report(total_time + progress.best_dist**2, progress.iteration)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+    return callback
 
 def sample_params(trial):
     """Define el modo en que se va a hacer el meustro de los hiper-parametros del algoritmo
@@ -95,11 +228,14 @@ class Objective(object):
         hiper-parámetros del algoritmo. Minimiza tiempo + (distancia)^2.
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos.
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2). Se compila una sola vez y
+        todos los intentos la reutilizan.
         init_node (int): Nodo inicial del recorrido.
     """
     def __init__(self, G, init_node):
-        self.G = G
+        self.G = as_instance(G)
         self.init_node = init_node
 
     def __call__(self, trial):
@@ -108,7 +244,7 @@ class Objective(object):
         
         # time algorithm
         start = time.time()
-        colony_.solve_tsp()
+        colony_.solve_tsp(callback=_pruning_callback(trial, start))
         end = time.time() 
         # total time in minutes
         total_time = (end - start) / 60
@@ -122,21 +258,26 @@ class Objective_mp(object):
         hiper-parámetros del algoritmo. Minimiza tiempo + (distancia)^2.
 
     Args:
-        G (networkx graph): Grafo con relaciones asociadas entre nodos.
+        G (networkx graph, TSPInstance or np.array): Grafo con relaciones
+        asociadas entre nodos, instancia compilada del problema, matriz de
+        distancias (n, n) o coordenadas (n, 2). Se compila una sola vez y
+        todos los intentos la reutilizan.
         init_node (int): Nodo inicial del recorrido.
+        n_workers (int, optional): Workers de cada colonia. Default es None
+        (todos los cores).
     """
-    def __init__(self, G, init_node):
-        self.G = G
+    def __init__(self, G, init_node, n_workers=None):
+        self.G = as_instance(G)
         self.init_node = init_node
-        self.n_workers = cpu_count()
+        self.n_workers = n_workers or cpu_count()
 
     def __call__(self, trial):
         aco_params = sample_params(trial)
-        colony_ = colony_multiw(self.G, self.init_node, self.n_workers, **aco_params)
+        colony_ = colony_multiw(self.G, self.init_node, n_workers=self.n_workers, **aco_params)
         
         # time algorithm
         start = time.time()
-        colony_.solve_tsp()
+        colony_.solve_tsp(callback=_pruning_callback(trial, start))
         end = time.time() 
         # total time in minutes
         total_time = (end - start) / 60
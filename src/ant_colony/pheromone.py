@@ -0,0 +1,231 @@
+import numpy as np
+from .distance import PackedSymmetric
+
+
+class PheromoneStore(object):
+    """Almacén denso de feromonas (tau), atracción a priori (eta^beta) y
+    atracción total (A) de las trayectorias del grafo. Todas las cantidades se guardan
+    como matrices de numpy de n x n, de modo que la evaporación, el cálculo de
+    la atracción y el depósito de feromonas de todas las hormigas de una
+    iteración se realizan con operaciones vectorizadas.
+
+    Si adj es una PackedSymmetric (instancias compactas, ver
+    TSPInstance.compact) tau, eta^beta y A se guardan también empacadas, como
+    triángulo superior, y cada tramo recibe su feromona una sola vez.
+
+    Args:
+        dist (np.array or CoordDistance): Matriz de distancias entre nodos.
+        Solo se materializa si falta adj, symmetric o eta_beta.
+        adj (np.array, optional): Matriz booleana que indica las trayectorias
+        existentes. Default es None (toda distancia positiva es trayectoria).
+        alpha (int, optional): Factor de influencia de tau. Defaults to 1.
+        beta (int, optional): Factor de influencia de eta. Defaults to 5.
+        rho (float, optional): Tasa de evaporación de las feromonas. Defaults to .5.
+        init_lev (float, optional): Nivel inicial de feromona de todas las
+        trayectorias. Default es 1.0.
+        symmetric (bool, optional): Deposita feromona en ambos sentidos de cada
+        trayectoria. Default es None (se detecta a partir de dist).
+        eta_beta (np.array, optional): eta^beta precalculado (por ejemplo, el de
+        una TSPInstance). Default es None (se calcula a partir de dist).
+        dtype (np.dtype, optional): Tipo de dato de tau y A. Default es np.float64.
+    """
+    def __init__(self, dist, adj=None,
+                 alpha=1,
+                 beta=5,
+                 rho=.5,
+                 init_lev=1.0,
+                 symmetric=None,
+                 eta_beta=None,
+                 dtype=np.float64):
+        self.n = dist.shape[0]
+        if adj is None or symmetric is None or eta_beta is None:
+            dist = np.ascontiguousarray(dist, dtype=np.float64)
+        self.alpha = alpha
+        self.beta = beta
+        self.rho = rho
+        if isinstance(adj, PackedSymmetric):
+            self.adj = adj
+            self.symmetric = True
+            self.tau = adj.like(np.where(adj.data, init_lev, 0.0).astype(dtype))
+            self.eta_beta = eta_beta
+            self.A = adj.like(np.zeros_like(self.tau.data))
+            self.tau_min = None
+            self.tau_max = None
+            return
+        if adj is None:
+            adj = dist > 0
+        adj = np.array(adj, dtype=bool)
+        np.fill_diagonal(adj, False)
+        self.adj = adj
+        if symmetric is None:
+            symmetric = np.allclose(dist, dist.T)
+        self.symmetric = symmetric
+        self.tau = np.where(adj, init_lev, 0.0).astype(dtype, copy=False)
+        if eta_beta is None:
+            eta_beta = init_eta(dist, adj)**beta
+        self.eta_beta = eta_beta
+        self.A = np.zeros_like(self.tau)
+        self.tau_min = None
+        self.tau_max = None
+
+    @classmethod
+    def from_instance(cls, instance, alpha=1, beta=5, rho=.5, init_lev=1.0):
+        """Crea el almacén de feromonas de una TSPInstance, reutilizando su
+        matriz de distancias y su eta^beta (empacados y en float32 si la
+        instancia es compacta).
+
+        Args:
+            instance (TSPInstance): Instancia compilada del problema.
+            alpha (int, optional): Factor de influencia de tau. Defaults to 1.
+            beta (int, optional): Factor de influencia de eta. Defaults to 5.
+            rho (float, optional): Tasa de evaporación de las feromonas. Defaults to .5.
+            init_lev (float, optional): Nivel inicial de feromona. Default es 1.0.
+
+        Returns:
+            (PheromoneStore): Almacén de feromonas.
+        """
+        return cls(instance.dist, instance.adj, alpha=alpha, beta=beta, rho=rho,
+                   init_lev=init_lev, symmetric=instance.symmetric,
+                   eta_beta=instance.eta_beta(beta), dtype=instance.dtype)
+
+    @property
+    def tau_data(self):
+        """Arreglo de numpy con los niveles de feromona: tau o, si está
+        empacada, su triángulo superior. Se modifica en su lugar.
+        """
+        return _flat(self.tau)
+
+    def attraction(self):
+        """Calcula el grado de atracción tau^alpha * eta^beta de todas las
+        trayectorias del grafo.
+
+        Returns:
+            (np.array): Matriz de atracción de los nodos con respecto a sus vecinos.
+        """
+        A, tau = _flat(self.A), _flat(self.tau)
+        if self.alpha == 1:
+            np.copyto(A, tau)
+        else:
+            np.power(tau, self.alpha, out=A)
+        A *= _flat(self.eta_beta)
+        return self.A
+
+    def reset(self, level):
+        """Reinicia el nivel de feromona de todas las trayectorias existentes.
+
+        Args:
+            level (float): Nuevo nivel de feromona.
+        """
+        _flat(self.tau)[_flat(self.adj)] = level
+
+    def set_bounds(self, tau_min, tau_max):
+        """Fija los límites de feromona de MAX-MIN Ant System, que se aplican
+        con clamp.
+
+        Args:
+            tau_min (float): Nivel mínimo de feromona.
+            tau_max (float): Nivel máximo de feromona.
+        """
+        self.tau_min = tau_min
+        self.tau_max = tau_max
+
+    def clamp(self):
+        """Acota tau al intervalo [tau_min, tau_max], si hay límites. Las
+        trayectorias inexistentes pueden quedar con tau_min, pero su eta^beta
+        es cero, así que no aportan atracción.
+        """
+        if self.tau_max is not None:
+            tau = _flat(self.tau)
+            np.clip(tau, self.tau_min, self.tau_max, out=tau)
+
+    def evaporate(self):
+        """Evapora los niveles de feromonas en todos los tramos del grafo.
+        """
+        tau = _flat(self.tau)
+        tau *= (1-self.rho)
+
+    def deposit(self, routes, distances, q=1.0):
+        """Deposita feromona sobre los tramos de todas las rutas recibidas. Cada
+        ruta aporta q/distancia sobre cada uno de sus tramos. Las rutas con
+        distancia no finita (recorridos incompletos) se ignoran.
+
+        Args:
+            routes (np.array or lst of lst): Recorridos realizados por las hormigas.
+            distances (lst of floats): Distancias de las rutas.
+            q (float, optional): Cantidad de feromona por ruta. Default es 1.0.
+        """
+        src, dst, owner = route_edges(routes)
+        distances = np.asarray(distances, dtype=np.float64)
+        if src.size == 0:
+            return
+        with np.errstate(divide='ignore'):
+            delta = np.where(np.isfinite(distances), q/distances, 0.0)[owner]
+        if isinstance(self.tau, PackedSymmetric):
+            np.add.at(self.tau.data, self.tau.index(src, dst), delta)
+            return
+        np.add.at(self.tau, (src, dst), delta)
+        if self.symmetric:
+            np.add.at(self.tau, (dst, src), delta)
+
+
+def init_eta(dist, adj, scale=1.0, dtype=np.float64):
+    """Calcula la atracción a priori (inversa de la distancia) de las
+    trayectorias existentes. Las trayectorias de longitud cero reciben la
+    mayor atracción observada.
+
+    Args:
+        dist (np.array): Matriz de distancias entre nodos.
+        adj (np.array): Matriz booleana de trayectorias existentes.
+        scale (float, optional): Distancia de referencia: eta = scale/dist.
+        Default es 1.0.
+        dtype (np.dtype, optional): Tipo de dato de eta. Default es np.float64.
+
+    Returns:
+        (np.array): Matriz con nivel de atracción inicial de las trayectorias.
+    """
+    eta = np.zeros(dist.shape, dtype=dtype)
+    pos = adj & (dist > 0)
+    eta[pos] = scale/dist[pos]
+    zero = adj & ~pos
+    if zero.any():
+        eta[zero] = eta.max() if pos.any() else 1.0
+    return eta
+
+
+def route_edges(routes):
+    """Convierte un conjunto de rutas en arreglos de índices de sus tramos.
+
+    Args:
+        routes (np.array or lst of lst): Rutas como matriz (hormigas x pasos) o
+        lista de rutas de longitud variable.
+
+    Returns:
+        (np.array, np.array, np.array): Nodos origen, nodos destino y número de
+        ruta de cada tramo.
+    """
+    if isinstance(routes, np.ndarray) and routes.ndim == 2:
+        m, steps = routes.shape
+        src = routes[:, :-1].ravel()
+        dst = routes[:, 1:].ravel()
+        owner = np.repeat(np.arange(m), steps-1)
+        return src, dst, owner
+
+    srcs, dsts, owners = [], [], []
+    for k, r in enumerate(routes):
+        r = np.asarray(r, dtype=np.intp)
+        if r.size < 2:
+            continue
+        srcs.append(r[:-1])
+        dsts.append(r[1:])
+        owners.append(np.full(r.size-1, k))
+    if not srcs:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty, empty
+    return np.concatenate(srcs), np.concatenate(dsts), np.concatenate(owners)
+
+
+def _flat(M):
+    """Arreglo de numpy con los datos de M (su triángulo superior si está
+    empacada). No está disponible para los usuarios.
+    """
+    return M.data if isinstance(M, PackedSymmetric) else M
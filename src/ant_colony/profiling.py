@@ -0,0 +1,132 @@
+import time
+from collections import Counter, defaultdict
+
+
+class RunStats(object):
+    """Instrumentación de una ejecución de la colonia: tiempo acumulado y
+    número de llamadas de cada fase del ciclo (atracción, evaporación,
+    recorridos, búsqueda local, depósito, arranque del pool, ...), contadores
+    de eventos y bytes transferidos entre procesos.
+
+    Las fases se miden con un context manager:
+
+        with stats.phase('walk'):
+            ...
+    """
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.calls = Counter()
+        self.counters = Counter()
+        self.bytes = Counter()
+
+    def phase(self, name):
+        """Context manager que acumula el tiempo de una fase.
+
+        Args:
+            name (str): Nombre de la fase.
+
+        Returns:
+            (context manager): Medidor de la fase.
+        """
+        return _Phase(self, name)
+
+    def count(self, name, n=1):
+        """Incrementa un contador.
+
+        Args:
+            name (str): Nombre del contador.
+            n (int, optional): Incremento. Default es 1.
+        """
+        self.counters[name] += n
+
+    def add_bytes(self, name, n):
+        """Acumula bytes transferidos.
+
+        Args:
+            name (str): Nombre del canal (p. ej. 'tasks' o 'results').
+            n (int): Número de bytes.
+        """
+        self.bytes[name] += n
+
+    def reset(self):
+        """Borra todas las mediciones.
+        """
+        self.times.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self.bytes.clear()
+
+    def summary(self):
+        """Resumen de las mediciones, listo para exportar (p. ej. como JSON).
+
+        Returns:
+            (dic): Tiempos (s) y llamadas por fase, contadores y bytes.
+        """
+        return {'times': dict(self.times),
+                'calls': dict(self.calls),
+                'counters': dict(self.counters),
+                'bytes': dict(self.bytes)}
+
+    def report(self):
+        """Tabla con el tiempo de cada fase, de mayor a menor.
+
+        Returns:
+            (str): Reporte para imprimir.
+        """
+        total = sum(self.times.values()) or 1.0
+        lines = [f"{'fase':<16}{'llamadas':>10}{'tiempo (s)':>12}{'%':>7}"]
+        for name, t in sorted(self.times.items(), key=lambda x: -x[1]):
+            lines.append(f'{name:<16}{self.calls[name]:>10}{t:>12.4f}{100*t/total:>7.1f}')
+        for name, n in sorted(self.counters.items()):
+            lines.append(f'{name:<16}{n:>10}')
+        for name, n in sorted(self.bytes.items()):
+            lines.append(f'{name + " (bytes)":<16}{n:>10}')
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return f'RunStats({self.summary()})'
+
+
+class _Phase(object):
+    """Medidor de una fase de RunStats. No está disponible para los usuarios.
+    """
+    __slots__ = ('stats', 'name', 'tic')
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.tic = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.times[self.name] += time.perf_counter() - self.tic
+        self.stats.calls[self.name] += 1
+        return False
+
+
+class _NoStats(object):
+    """Instrumentación desactivada: mismas operaciones que RunStats sin ningún
+    costo más allá de la llamada. No está disponible para los usuarios.
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def phase(self, name):
+        return self
+
+    def count(self, name, n=1):
+        pass
+
+    def add_bytes(self, name, n):
+        pass
+
+    def reset(self):
+        pass
+
+
+NO_STATS = _NoStats()
@@ -0,0 +1,93 @@
+import numpy as np
+
+# hormigas por lote: cada lote tiene su propio generador en cada iteración
+ANT_BATCH = 16
+# uniformes generados por bloque
+BLOCK_SIZE = 2**18
+
+
+def n_batches(n_ants, batch=ANT_BATCH):
+    """Número de lotes de hormigas de una colonia.
+
+    Args:
+        n_ants (int): Número de hormigas.
+        batch (int, optional): Hormigas por lote. Default es ANT_BATCH.
+
+    Returns:
+        (int): Número de lotes (el último puede estar incompleto).
+    """
+    return -(-n_ants // batch)
+
+
+def batch_seeds(rng, n_ants, batch=ANT_BATCH):
+    """Semillas de los lotes de hormigas de una iteración, tomadas del
+    generador de la colonia.
+
+    Args:
+        rng (np.random.Generator): Generador de la colonia.
+        n_ants (int): Número de hormigas.
+        batch (int, optional): Hormigas por lote. Default es ANT_BATCH.
+
+    Returns:
+        (np.array): Una semilla por lote.
+    """
+    return rng.integers(2**63, size=n_batches(n_ants, batch))
+
+
+def uniform_steps(seeds, n_ants, n_steps, batch=ANT_BATCH, block=BLOCK_SIZE,
+                  lo=0, total=None):
+    """Uniformes de la ruleta de cada paso de construcción, pre-generados por
+    bloques de pasos. Cada lote de hormigas usa un generador propio sembrado
+    con su semilla y cada hormiga toma la columna que le corresponde por su
+    índice en la colonia, de modo que los números de una hormiga no dependen
+    de cómo se repartan las hormigas entre workers ni del tamaño del bloque.
+
+    Args:
+        seeds (np.array): Semillas de los lotes que contienen a las hormigas
+        lo, ..., lo+n_ants-1 (ver batch_seeds), empezando por el lote lo//batch.
+        n_ants (int): Número de hormigas.
+        n_steps (int): Número de pasos.
+        batch (int, optional): Hormigas por lote. Default es ANT_BATCH.
+        block (int, optional): Uniformes por bloque. Default es BLOCK_SIZE.
+        lo (int, optional): Índice en la colonia de la primera hormiga.
+        Default es 0.
+        total (int, optional): Número de hormigas de la colonia. Default es
+        None (lo + n_ants).
+
+    Yields:
+        (np.array): n_ants uniformes en [0, 1) por paso.
+    """
+    total = lo + n_ants if total is None else total
+    first = lo // batch
+    gens = [np.random.default_rng(int(s)) for s in seeds]
+    sizes = [min(batch, total - (first + b)*batch) for b in range(len(gens))]
+    # the batches may start before lo and end after lo + n_ants
+    skip = lo - first*batch
+    width = sum(sizes)
+    rows = max(1, block // max(width, 1))
+    for s0 in range(0, n_steps, rows):
+        r = min(rows, n_steps - s0)
+        u = np.empty((r, width))
+        col = 0
+        for gen, size in zip(gens, sizes):
+            u[:, col:col + size] = gen.random((r, size))
+            col += size
+        yield from u[:, skip:skip + n_ants]
+
+
+def rng_steps(rng, n_ants, n_steps, block=BLOCK_SIZE):
+    """Uniformes de cada paso tomados de un solo generador, pre-generados por
+    bloques. Produce la misma secuencia que pedir n_ants uniformes por paso.
+
+    Args:
+        rng (np.random.Generator): Generador de números aleatorios.
+        n_ants (int): Número de hormigas.
+        n_steps (int): Número de pasos.
+        block (int, optional): Uniformes por bloque. Default es BLOCK_SIZE.
+
+    Yields:
+        (np.array): n_ants uniformes en [0, 1) por paso.
+    """
+    rows = max(1, block // max(n_ants, 1))
+    for s0 in range(0, n_steps, rows):
+        yield from rng.random((min(rows, n_steps - s0), n_ants))
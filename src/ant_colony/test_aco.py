@@ -4,6 +4,7 @@ import numpy as np
 import random
 from . import aco_tsp
 from . import utils
+import os
 import time
 
 from .utils import create_dic_dist
@@ -15,6 +16,15 @@ from .utils import read_data
 from .utils import rand_dist_matrix
 from .utils import plot_graph
 from .utils import graph_optim_path
+from .pheromone import PheromoneStore
+from .construction import build_tours, greedy_edge_tour, nearest_neighbor_tour, tour_diversity
+from .candidates import candidate_lists, candidate_lists_coords
+from .instance import TSPInstance
+from .distance import CoordDistance, PackedSymmetric
+from .local_search import local_search
+from .benchmark import run_benchmarks, compare, check_imports, import_times, IMPORT_BUDGET
+from .streams import uniform_steps
+from .bulk import solve_many
 
 from .aco_tsp_oo import *
 
@@ -130,6 +140,57 @@ def test_distancia_hormiga_dif_de_cero():
         result = False
     assert result
     
+def test_store_deposito_en_tramos():
+    """Revisa que el depósito vectorizado solo sume feromona en los tramos de las rutas.
+    """
+    matriz = utils.rand_dist_matrix(6, graph=False, seed=1950)
+    store = PheromoneStore(matriz, rho=.5)
+    rutas = np.array([[0, 1, 2, 3, 4, 5, 0], [0, 2, 1, 3, 5, 4, 0]])
+    store.deposit(rutas, [2., 4.])
+    assert np.isclose(store.tau[0, 1], 1 + 1/2)
+    assert np.isclose(store.tau[1, 2], 1 + 1/2 + 1/4)
+    assert np.isclose(store.tau[2, 1], store.tau[1, 2])
+    assert np.isclose(store.tau[0, 3], 1.0)
+    assert store.tau[0, 0] == 0
+
+def test_store_evaporacion_y_atraccion():
+    """Revisa la evaporación y el cálculo de la atracción tau^alpha * eta^beta.
+    """
+    matriz = utils.rand_dist_matrix(6, graph=False, seed=1950)
+    store = PheromoneStore(matriz, alpha=2, beta=3, rho=.25)
+    store.evaporate()
+    A = store.attraction()
+    esperado = (0.75**2) * (1/matriz[1, 4])**3
+    assert np.isclose(A[1, 4], esperado)
+    assert np.all(np.diag(A) == 0)
+
+def test_construccion_por_lote():
+    """Revisa que cada recorrido del lote sea una permutación que regresa al origen.
+    """
+    matriz = utils.rand_dist_matrix(12, graph=False, seed=1950)
+    store = PheromoneStore(matriz)
+    tours, dists = build_tours(store.attraction(), matriz, 3, 50, np.random.default_rng(7))
+    assert tours.shape == (50, 13) and tours.dtype == np.int32
+    assert np.all(tours[:, 0] == 3) and np.all(tours[:, -1] == 3)
+    assert np.all(np.sort(tours[:, :-1], axis=1) == np.arange(12))
+    assert np.allclose(dists, matriz[tours[:, :-1], tours[:, 1:]].sum(axis=1))
+
+def test_listas_de_candidatos():
+    """Revisa que las listas de candidatos por matriz y por KD-tree coincidan y
+    que las hormigas completen su recorrido usándolas.
+    """
+    rng = np.random.default_rng(1950)
+    coords = rng.random((40, 2))
+    matriz = np.sqrt(((coords[:, None] - coords[None])**2).sum(-1))
+    cand = candidate_lists(matriz, 5)
+    assert cand.shape == (40, 5)
+    assert not np.any(cand == np.arange(40)[:, None])
+    assert np.all(cand == candidate_lists_coords(coords, 5))
+    store = PheromoneStore(matriz)
+    tours, dists = build_tours(store.attraction(), matriz, 0, 20, rng, candidates=cand)
+    assert np.all(np.sort(tours[:, :-1], axis=1) == np.arange(40))
+    assert np.all(np.isfinite(dists))
+
 def test_ejemplo_completo():
     """Revisa el ejemplo completo para ver si la distancia es cero. Pasa la prueba si es distinto a cero.
     """
@@ -202,4 +263,654 @@ def test_compara_tiempos_colony_multiw_vs_colony():
     
     secs_old = end_time-start_time
     
-    assert secs_colony_mw < secs_old
\ No newline at end of file
+    assert secs_colony_mw < secs_old
+
+def test_colony_multiw_pool_persistente():
+    """Revisa que el pool con memoria compartida produzca rutas válidas y se
+    libere al terminar.
+    """
+    G = utils.rand_dist_matrix(20, seed=1950)
+    colony_mw = colony_multiw(G, init_node=0, n_ants=8, max_iter=3, n_workers=2)
+    colony_mw.min_pool_work = 0
+    colony_mw.solve_tsp()
+    assert sorted(colony_mw.best_route[:-1]) == list(range(20))
+    assert colony_mw._pool is None and colony_mw._shared == {}
+    # la atracción sigue legible después de liberar la memoria compartida
+    assert colony_mw.A is colony_mw.store.A and np.isfinite(colony_mw.A.sum())
+
+
+def test_instancia_compilada_reutilizable():
+    """Revisa que una TSPInstance se comparta entre solvers y respete las
+    etiquetas de los nodos.
+    """
+    inst = TSPInstance.from_tsplib('./datasets/gr17.tsp')
+    assert inst.n == 17 and inst.symmetric
+    assert inst.eta_beta(3) is inst.eta_beta(3)
+    assert np.allclose(inst.dist, TSPInstance.from_tsplib('./datasets/gr17_d_city_distances.txt').dist)
+    colonia = colony(inst, init_node=4, n_ants=5, max_iter=5, alpha=3, beta=3)
+    colonia.solve_tsp()
+    assert colonia.store.eta_beta is inst.eta_beta(3)
+    assert colonia.best_route[0] == 4 and sorted(colonia.best_route[:-1]) == list(range(17))
+
+
+def test_instancia_con_etiquetas(tmp_path):
+    """Revisa que una instancia TSPLIB EUC_2D con nodos 1..n regrese rutas con sus etiquetas.
+    """
+    path = tmp_path / 'mini.tsp'
+    coords = '\n'.join(f'{i+1} {x} {y}' for i, (x, y) in enumerate([(0, 0), (0, 10), (10, 10), (10, 0), (5, 5)]))
+    path.write_text('NAME : mini\nTYPE : TSP\nDIMENSION : 5\nEDGE_WEIGHT_TYPE : EUC_2D\n'
+                    'NODE_COORD_SECTION\n' + coords + '\nEOF\n')
+    inst = TSPInstance.from_tsplib(str(path))
+    assert inst.nodes == [1, 2, 3, 4, 5] and inst.dist[0, 4] == 7
+    colonia = colony(inst, init_node=1, n_ants=5, max_iter=3)
+    colonia.solve_tsp()
+    assert colonia.best_route[0] == 1 and sorted(colonia.best_route[:-1]) == [1, 2, 3, 4, 5]
+
+
+def test_tsplib_cache(tmp_path):
+    """Revisa que el caché binario de un .tsp se cree, se reutilice y se invalide al cambiar el archivo.
+    """
+    from .tsplib import load_tsplib, parse_tsplib
+
+    path = tmp_path / 'mini.tsp'
+    path.write_text('NAME : mini\nDIMENSION : 3\nEDGE_WEIGHT_TYPE : EUC_2D\n'
+                    'NODE_COORD_SECTION\n1 0 0\n2 3 4\n3 6 8\nEOF\n')
+    header, nodes, coords = load_tsplib(str(path))
+    assert (tmp_path / 'mini.tsp.npy').exists() and header['DIMENSION'] == '3'
+    assert not list(tmp_path.glob('*.tmp'))
+    _, nodes_c, coords_c = load_tsplib(str(path))
+    assert isinstance(coords_c, np.memmap)
+    assert np.array_equal(nodes_c, nodes) and np.array_equal(coords_c, coords)
+    path.write_text('NAME : mini\nDIMENSION : 2\nEDGE_WEIGHT_TYPE : EUC_2D\n'
+                    'NODE_COORD_SECTION\n1 0 0\n2 3 4\nEOF\n')
+    _, nodes, coords = load_tsplib(str(path))
+    assert coords.shape == (2, 2) and list(nodes) == [1, 2]
+    # formato explícito LOWER_DIAG_ROW
+    _, _, w = parse_tsplib('./datasets/gr17.tsp')
+    assert np.array_equal(w, np.loadtxt('./datasets/gr17_d_city_distances.txt'))
+
+
+def test_distancias_implicitas():
+    """Revisa que CoordDistance reproduzca la matriz densa EUC_2D sin materializarla en los solvers.
+    """
+    rng = np.random.default_rng(1959)
+    coords = rng.random((40, 2)) * 100
+    dist = CoordDistance(coords, 'EUC_2D', cache_rows=2)
+    matriz = np.floor(np.sqrt(((coords[:, None] - coords[None])**2).sum(-1)) + 0.5)
+    i, j = rng.integers(40, size=(2, 5, 6))
+    assert np.array_equal(dist[i, j], matriz[i, j]) and dist[3, 7] == matriz[3, 7]
+    assert np.array_equal(dist[5], matriz[5]) and np.array_equal(dist[2:4], matriz[2:4])
+    dist[5], dist[6], dist[5]
+    assert dist.hits == 2 and len(dist._rows) == 2
+    inst = TSPInstance.from_coords(coords, kind='EUC_2D', dense=False)
+    colonia = colony(inst, init_node=0, n_ants=5, max_iter=3, n_neighbors=8, local_search='best')
+    colonia.solve_tsp()
+    ruta = colonia.best_route
+    assert sorted(ruta[:-1]) == list(range(40))
+    assert np.isclose(colonia.best_dist, matriz[ruta[:-1], ruta[1:]].sum())
+
+
+def test_solvers_sin_grafo():
+    """Revisa que los solvers acepten matrices y coordenadas sin construir un grafo de networkx.
+    """
+    matriz = rand_dist_matrix(12, graph=False)
+    colonia = colony.from_matrix(matriz, init_node=3, n_ants=4, max_iter=3)
+    colonia.solve_tsp()
+    assert colonia.instance.graph is None and colonia.best_route[0] == 3
+    coords = np.random.default_rng(1951).random((15, 2))
+    colonia = colony_multiw.from_coords(coords, n_ants=4, max_iter=2, n_workers=2)
+    colonia.solve_tsp()
+    assert colonia.instance.graph is None and sorted(colonia.best_route[:-1]) == list(range(15))
+    ruta, dist = aco_tsp.ant_colony(matriz, graph=False, ants=4, max_iter=3)
+    assert sorted(ruta[:-1]) == list(range(12)) and np.isfinite(dist)
+
+
+def test_colony_mmas():
+    """Revisa MAX-MIN Ant System: tau inicia en tau_max del recorrido greedy y queda acotado.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    matriz = np.loadtxt('./datasets/gr17_d_city_distances.txt')
+    ruta, dist = nearest_neighbor_tour(matriz, 0)
+    assert sorted(ruta[:-1]) == list(range(17)) and np.isclose(dist, matriz[ruta[:-1], ruta[1:]].sum())
+    for best in ('iteration', 'global'):
+        colonia = colony(G, init_node=0, n_ants=10, max_iter=30, rho=.2, mmas=True, mmas_best=best)
+        store = colonia.store
+        assert store.tau[0, 1] == store.tau_max and 2085 <= 1/(.2*store.tau_max) < 2085 * 1.1
+        colonia.solve_tsp()
+        assert colonia.best_dist <= dist and colonia.best_dist < 2085 * 1.1
+        assert np.isclose(store.tau_max, 1/(.2*colonia.best_dist))
+        assert store.tau.min() >= store.tau_min and store.tau.max() <= store.tau_max
+
+    import pytest
+    for rho in (0, 1.5):
+        with pytest.raises(ValueError, match='rho'):
+            colony(G, init_node=0, rho=rho, mmas=True)
+
+
+def test_paro_anticipado():
+    """Revisa los criterios de paro por tiempo, por falta de mejora y por diversidad.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    colonia = colony(G, init_node=0, n_ants=5, max_iter=10**6, time_limit=.2)
+    colonia.solve_tsp()
+    assert colonia.stop_reason == 'time_limit' and colonia.elapsed < .5
+    colonia = colony(G, init_node=0, n_ants=5, max_iter=10**6, patience=5)
+    colonia.solve_tsp()
+    assert colonia.stop_reason == 'patience' and colonia.n_iter < 10**6
+    colonia = colony_multiw(G, init_node=0, n_ants=5, max_iter=10**6, min_diversity=.05)
+    colonia.solve_tsp()
+    assert colonia.stop_reason == 'diversity'
+    colonia = colony(G, init_node=0, n_ants=5, max_iter=3, patience=100)
+    colonia.solve_tsp()
+    assert colonia.stop_reason == 'max_iter' and colonia.n_iter == 3
+    ruta = np.arange(18) % 17
+    assert tour_diversity(np.stack([ruta, ruta]), ruta) == 0
+    assert tour_diversity(ruta[None, ::-1], ruta) == 0
+    ruta_d, dist = aco_tsp.ant_colony(G, graph=False, ants=5, max_iter=10**6, patience=5)
+    assert sorted(ruta_d[:-1]) == list(range(17))
+
+
+def test_iter_solve():
+    """Revisa que iter_solve entregue el avance por iteración y se pueda cancelar.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    colonia = colony(G, init_node=0, n_ants=5, max_iter=20)
+    avance = []
+    for registro in colonia.iter_solve():
+        avance.append(registro)
+        if registro.iteration == 4:
+            break
+    assert [r.iteration for r in avance] == [1, 2, 3, 4]
+    assert all(a.best_dist >= b.best_dist for a, b in zip(avance, avance[1:]))
+    assert colonia.stop_reason == 'cancelled' and colonia.n_iter == 4
+    assert isinstance(avance[-1].best_tour, np.ndarray) and avance[-1].best_tour[0] == 0
+    colony_mw = colony_multiw(G, init_node=0, n_ants=4, max_iter=50, n_workers=2)
+    colony_mw.min_pool_work = 0
+    for registro in colony_mw.iter_solve():
+        colony_mw.stop()
+    assert colony_mw.stop_reason == 'cancelled' and colony_mw._pool is None
+
+
+def test_inicio_fallido_libera_memoria(monkeypatch):
+    """Revisa que si el pool no logra crearse la memoria compartida ya reservada se libere.
+    """
+    import pytest
+    from multiprocessing import shared_memory
+    from . import aco_tsp_oo
+
+    def pool_fallido(*args, **kwargs):
+        raise OSError('sin procesos')
+
+    monkeypatch.setattr(aco_tsp_oo, 'Pool', pool_fallido)
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    colony_mw = colony_multiw(G, init_node=0, n_ants=4, max_iter=5, n_workers=2)
+    colony_mw.min_pool_work = 0
+    creados = []
+    original = aco_tsp_oo.SharedArray.from_array
+    monkeypatch.setattr(aco_tsp_oo.SharedArray, 'from_array',
+                        classmethod(lambda cls, arr: creados.append(original(arr)) or creados[-1]))
+    with pytest.raises(OSError):
+        colony_mw.solve_tsp()
+    assert colony_mw._shared == {} and colony_mw._pool is None and creados
+    for bloque in creados:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=bloque.spec[0])
+
+
+def test_checkpoint_y_reanudacion(tmp_path):
+    """Revisa que una colonia restaurada desde un checkpoint continúe igual que la ejecución original.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    ruta = str(tmp_path / 'estado.npz')
+    completa = colony(G, init_node=0, n_ants=5, max_iter=12, mmas=True, seed=1959)
+    completa.solve_tsp()
+    parcial = colony(G, init_node=0, n_ants=5, max_iter=12, mmas=True, seed=1959,
+                     checkpoint=ruta, checkpoint_every=5)
+    for registro in parcial.iter_solve():
+        if registro.iteration == 7:
+            break
+    reanudada = colony(G, init_node=0, n_ants=5, max_iter=12, mmas=True)
+    reanudada.load_state(ruta)
+    assert reanudada.n_iter == 5
+    reanudada.solve_tsp()
+    assert reanudada.n_iter == 12 and reanudada.best_dist == completa.best_dist
+    assert reanudada.best_route == completa.best_route
+    assert np.array_equal(reanudada.store.tau, completa.store.tau)
+
+
+def test_colony_islands():
+    """Revisa el modelo de islas con migración de la mejor ruta y con mezcla de feromonas.
+    """
+    from .islands import colony_islands
+
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    for migration in ('best', 'blend'):
+        islas = colony_islands(G, init_node=0, n_islands=2, max_iter=12, migrate_every=4,
+                               migration=migration, seed=1959, n_ants=5)
+        islas.solve_tsp()
+        assert islas.n_iter == 12 and islas.stop_reason == 'max_iter'
+        assert islas.best_dist == min(islas.island_dists) < 2085 * 1.2
+        assert islas.best_route[0] == 0 and sorted(islas.best_route[:-1]) == list(range(17))
+    # options meant for a single colony must not clash with the island's own
+    islas = colony_islands(G, init_node=0, n_islands=2, max_iter=4, seed=1959, n_ants=5)
+    islas.kwargs.update(max_iter=50, seed=7)
+    islas.solve_tsp()
+    assert islas.n_iter == 4 and islas.best_dist < float('inf')
+
+
+def test_callback_por_iteracion():
+    """Revisa que el callback de solve_tsp reciba cada iteración y pueda detener la colonia.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    vistos = []
+    colonia = colony(G, init_node=0, n_ants=5, max_iter=20)
+    colonia.solve_tsp(callback=lambda p: vistos.append(p.iteration) or p.iteration == 3)
+    assert vistos == [1, 2, 3] and colonia.stop_reason == 'cancelled'
+
+    def poda(progress):
+        raise KeyboardInterrupt
+
+    colony_mw = colony_multiw(G, init_node=0, n_ants=4, max_iter=20, n_workers=2)
+    colony_mw.min_pool_work = 0
+    try:
+        colony_mw.solve_tsp(callback=poda)
+    except KeyboardInterrupt:
+        pass
+    assert colony_mw.n_iter == 1 and colony_mw._pool is None and not colony_mw._shared
+
+
+def test_submuestra_de_instancia():
+    """Revisa que la submuestra conserve etiquetas y distancias, con el mismo muestreo que read_coord_data.
+    """
+    coords = np.random.default_rng(1951).random((30, 2))
+    inst = TSPInstance.from_coords(coords, nodes=list(range(100, 130)))
+    sub = inst.subsample(8, seed=7)
+    idx = np.random.RandomState(7).choice(30, 8, replace=False)
+    assert sub.nodes == [100 + i for i in idx]
+    assert np.array_equal(sub.dist, inst.dist[np.ix_(idx, idx)])
+    assert np.array_equal(sub.coords, coords[idx])
+    implicita = TSPInstance.from_coords(coords, dense=False).subsample(8, seed=7)
+    assert np.allclose(implicita.dist, sub.dist)
+
+
+def test_semilla_reproducible():
+    """Revisa que con la misma semilla colony y colony_multiw encuentren las mismas rutas sin importar n_workers.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    rutas = []
+    for n_workers in (None, 1, 2, 3, 7):
+        if n_workers is None:
+            colony_ = colony(G, 0, n_ants=40, max_iter=5, seed=1959)
+        else:
+            colony_ = colony_multiw(G, 0, n_ants=40, max_iter=5, seed=1959,
+                                    n_workers=n_workers)
+            colony_.min_pool_work = 0
+        colony_.solve_tsp()
+        rutas.append((colony_.best_dist, colony_.best_route))
+    assert all(r == rutas[0] for r in rutas)
+
+    # las hormigas se reparten parejo entre todos los workers
+    for n_ants, n_workers in ((100, 12), (8, 2), (3, 5)):
+        colony_ = colony_multiw(G, 0, n_ants=n_ants, n_workers=n_workers)
+        reparto = [a[0] for a in colony_.ants_per_worker]
+        assert len(reparto) == min(n_workers, n_ants) and sum(reparto) == n_ants
+        assert max(reparto) - min(reparto) <= 1
+
+    # los uniformes no dependen del tamaño de bloque ni del reparto de lotes
+    semillas = [11, 12, 13]
+    todo = np.array(list(uniform_steps(semillas, 40, 30)))
+    chico = np.array(list(uniform_steps(semillas, 40, 30, block=100)))
+    parte = np.array(list(uniform_steps(semillas[1:], 24, 30)))
+    assert np.array_equal(todo, chico)
+    assert np.array_equal(todo[:, 16:], parte)
+    medio = np.array(list(uniform_steps(semillas[:2], 10, 30, lo=10, total=40)))
+    assert np.array_equal(todo[:, 10:20], medio)
+
+    assert (aco_tsp.ant_colony(G, graph=False, ants=10, max_iter=3, seed=7) ==
+            aco_tsp.ant_colony(G, graph=False, ants=10, max_iter=3, seed=7))
+
+
+def test_perfilado_por_fase():
+    """Revisa las mediciones por fase de la colonia y su exportación al terminar cada ejecución.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    exportados = []
+    colony_ = colony(G, 0, n_ants=10, max_iter=10, local_search='best',
+                     profile=True, on_stats=exportados.append)
+    colony_.solve_tsp()
+    stats = colony_.stats
+    assert exportados == [stats]
+    assert stats.calls['attraction'] == stats.calls['walk'] == 10
+    assert stats.calls['local_search'] == stats.calls['deposit'] == 10
+    assert stats.calls['evaporation'] == 8
+    assert stats.counters == {'iterations': 10, 'tours': 100}
+    assert set(stats.summary()) == {'times', 'calls', 'counters', 'bytes'}
+
+    # desactivado no hay mediciones; on_stats lo activa
+    assert colony(G, 0, n_ants=2, max_iter=2).stats is None
+    exportados = []
+    colony(G, 0, n_ants=2, max_iter=2, on_stats=exportados.append).solve_tsp()
+    assert len(exportados) == 1 and exportados[0].calls['walk'] == 2
+
+    # bytes enviados al pool de colony_multiw
+    colony_ = colony_multiw(G, 0, n_ants=10, max_iter=3, n_workers=2, profile=True)
+    colony_.min_pool_work = 0
+    colony_.solve_tsp()
+    assert colony_.stats.calls['start'] == 1 and colony_.stats.calls['walk'] == 3
+    assert colony_.stats.bytes['tasks'] > 0 and colony_.stats.bytes['initargs'] > 0
+
+
+def test_benchmark():
+    """Revisa el benchmark: registros por caso y solver, gap contra el óptimo y detección de regresiones.
+    """
+    solvers = {'colony': dict(n_ants=5, max_iter=3),
+               'ant_colony': dict(ants=5, max_iter=3)}
+    resultados = run_benchmarks(cases=[('gr17', 'gr17_d_city_distances.txt', None)],
+                                solvers=solvers)
+    assert [r['solver'] for r in resultados] == ['colony', 'ant_colony']
+    for r in resultados:
+        assert r['n'] == 17 and r['n_iter'] == 3
+        assert r['best'] >= 2085
+        assert r['gap'] == 100*(r['best'] - 2085)/2085
+        assert r['peak_mem_mb'] > 0 and r['time_per_iter'] > 0
+
+    # contra sí mismo no hay regresiones; con un baseline mejor sí
+    assert compare(resultados, resultados) == []
+    baseline = [dict(r, best=r['best']/2) for r in resultados]
+    regresiones = compare(resultados, baseline)
+    assert len(regresiones) == 2 and all('best' in m for m in regresiones)
+
+
+def test_warm_start():
+    """Revisa que el warm start construya rutas válidas, inicialice tau con su distancia y arranque desde ellas.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    inst = TSPInstance.from_graph(G)
+    greedy, l_greedy = greedy_edge_tour(inst.dist, 0, inst.candidates(10))
+    assert greedy[0] == greedy[-1] == 0 and sorted(greedy[:-1]) == list(range(17))
+    assert l_greedy == inst.dist[greedy[:-1], greedy[1:]].sum()
+
+    for warm in ('nn', 'greedy'):
+        colony_ = colony(G, 0, n_ants=10, max_iter=5, warm_start=warm, seed=1959)
+        inicial = colony_.best_dist
+        assert np.isfinite(inicial) and colony_.best_route[0] == 0
+        tau0 = 10/inicial
+        en_ruta = colony_.tau[colony_.best_tour[:-1], colony_.best_tour[1:]]
+        assert np.allclose(en_ruta, 2*tau0)
+        fuera = colony_.tau.copy()
+        fuera[colony_.best_tour[:-1], colony_.best_tour[1:]] = tau0
+        fuera[colony_.best_tour[1:], colony_.best_tour[:-1]] = tau0
+        assert np.allclose(fuera[colony_.store.adj], tau0)
+        colony_.solve_tsp()
+        assert colony_.best_dist <= inicial
+
+    # con MAX-MIN el sesgo se conserva dentro de [tau_min, tau_max]
+    colony_ = colony(G, 0, n_ants=10, max_iter=0, warm_start='nn', mmas=True, warm_bias=1.0)
+    tau, store = colony_.tau, colony_.store
+    en_ruta = tau[colony_.best_tour[:-1], colony_.best_tour[1:]]
+    assert np.allclose(en_ruta, store.tau_max)
+    assert np.allclose(tau[store.adj].min(), max(store.tau_max/2, store.tau_min))
+    assert tau[store.adj].min() < tau[store.adj].max()
+
+    # ruta de una instancia parecida: se ignoran nodos ajenos y se insertan los faltantes
+    previa = [0, 99, 5, 3, 12, 6, 7, 16, 13, 14, 2, 10, 9, 1, 4, 8, 11, 15, 0]
+    colony_ = colony(G, 0, n_ants=10, max_iter=1, warm_start=previa)
+    assert sorted(colony_.best_route[:-1]) == list(range(17))
+    assert 99 not in colony_.best_route
+
+    # best_route también sirve como punto de partida
+    ruta = [0, 3, 12, 6, 7, 5, 16, 13, 14, 2, 10, 9, 1, 4, 8, 11, 15, 0]
+    colony_ = colony(G, 0, best_route=ruta, best_dist=2085, n_ants=10, max_iter=1)
+    assert colony_.best_dist == 2085 and colony_.best_tour is not None
+
+
+def test_solve_many():
+    """Revisa que solve_many resuelva todas las instancias y que con semilla el resultado no dependa de n_workers.
+    """
+    instancias = [utils.rand_dist_matrix(10, graph=False, seed=s) for s in range(6)]
+    params = dict(n_ants=5, max_iter=5)
+    serie = list(solve_many(instancias, params, n_workers=1, seed=1959))
+    paralelo = list(solve_many(instancias, params, n_workers=2, seed=1959))
+    assert [r.index for r in serie] == list(range(6))
+    assert [r[:6] for r in sorted(paralelo)] == [r[:6] for r in serie]
+    for r in serie:
+        assert sorted(r.best_route[:-1]) == list(range(10)) and r.best_route[0] == 0
+        assert r.n_iter == 5 and r.stop_reason == 'max_iter'
+
+    # parámetros y límites de tiempo por instancia
+    tsp = './datasets/gr17_d_city_distances.txt'
+    r, = solve_many([tsp], [dict(n_ants=5, max_iter=1000, init_node=3)],
+                    n_workers=1, time_limit=[.05])
+    assert r.best_route[0] == 3 and r.stop_reason == 'time_limit'
+
+    # seed y time_limit también pueden venir en los parámetros
+    propios = list(solve_many(instancias[:2], dict(params, seed=7, time_limit=60), n_workers=1))
+    assert [r.error for r in propios] == [None, None]
+    assert [r[:6] for r in propios] == [r[:6] for r in solve_many(
+        instancias[:2], dict(params, seed=7), n_workers=1)]
+    r, = solve_many([tsp], dict(n_ants=5, max_iter=1000, time_limit=60), n_workers=1,
+                    time_limit=.05)
+    assert r.stop_reason == 'time_limit'
+
+
+def test_linea_de_comandos(tmp_path, capsys):
+    """Revisa que aco-tsp resuelva un directorio y escriba un renglón JSON por archivo.
+    """
+    import json
+    import optuna
+    from .cli import main
+
+    datos = tmp_path / 'datos'
+    datos.mkdir()
+    for archivo in ('p01_d.txt', 'gr17_d_city_distances.txt'):
+        (datos / archivo).write_text(open('./datasets/' + archivo).read())
+    # estudio previo con los mejores parámetros
+    db = str(tmp_path / 'estudio.db')
+    study = optuna.create_study(study_name='optimize_aco', storage='sqlite:///' + db)
+
+    def objetivo(trial):
+        trial.suggest_int('n_ants', 2, 2048, log=True)
+        trial.suggest_float('rho', 0.0, 1.0)
+        return 1.0
+
+    # API compatible con optuna 2.x (requirements.txt)
+    study.enqueue_trial({'n_ants': 6, 'rho': .3})
+    study.optimize(objetivo, n_trials=1)
+
+    salida = tmp_path / 'rutas.jsonl'
+    assert main([str(datos), '--iters', '4', '--seed', '1959', '--params-from', db,
+                 '--rho', '.5', '--out', str(salida)]) == 0
+    registros = [json.loads(r) for r in salida.read_text().splitlines()]
+    assert [os.path.basename(r['file']) for r in registros] == ['gr17_d_city_distances.txt', 'p01_d.txt']
+    for r in registros:
+        assert r['params'] == {'n_ants': 6, 'rho': .5, 'max_iter': 4}
+        assert r['n_iter'] == 4 and sorted(r['tour'][:-1]) == list(range(r['n']))
+        assert r['best_dist'] >= {17: 2085, 15: 291}[r['n']]
+
+    # un archivo inválido se reporta sin perder el resto del lote
+    (datos / 'roto.txt').write_text('no es una matriz\n')
+    assert main([str(datos), '--iters', '2', '--out', str(salida)]) == 1
+    assert len(salida.read_text().splitlines()) == 2
+    assert 'roto.txt' in capsys.readouterr().err
+
+
+def test_importacion_perezosa():
+    """Revisa que importar el núcleo del solver no cargue las librerías de gráficas, mapas ni optimización.
+    """
+    registros = import_times(repeat=1)
+    assert [r['module'] for r in registros] == list(IMPORT_BUDGET)
+    assert all(r['heavy'] == [] for r in registros)
+    assert check_imports([{'module': 'ant_colony', 'time': 0.0, 'heavy': ['optuna']}]) != []
+
+    import importlib
+    paquete = importlib.import_module(__package__)
+    assert paquete.colony is colony
+    assert 'solve_many' in dir(paquete)
+
+
+def test_modo_compacto(tmp_path):
+    """Revisa que el modo compacto (float32 y triángulo superior) encuentre las mismas rutas con menos memoria.
+    """
+    M = np.random.default_rng(1959).random((9, 9))
+    M = M + M.T
+    P = PackedSymmetric.from_dense(M)
+    assert np.array_equal(P.data, M[np.triu_indices(9)]) and np.array_equal(np.asarray(P), M)
+    assert np.array_equal(P[4], M[4]) and np.array_equal(P[[1, 7], [3, 2]], M[[1, 7], [3, 2]])
+    assert P[6, 2] == M[6, 2] and np.array_equal(P[2:5], M[2:5])
+
+    instancia = TSPInstance.from_graph(read_data('./datasets/gr17_d_city_distances.txt'))
+    compacta = instancia.compact()
+    assert compacta.packed and compacta.dist.dtype == np.float32
+    assert instancia.compact() is compacta
+    assert compacta.dist.nbytes * 3 < instancia.dist.nbytes
+    densa = colony(instancia, init_node=0, n_ants=5, max_iter=10, mmas=True, seed=1959)
+    densa.solve_tsp()
+    chica = colony(instancia, init_node=0, n_ants=5, max_iter=10, mmas=True, seed=1959,
+                   compact=True, checkpoint=str(tmp_path / 'estado.npz'))
+    chica.solve_tsp()
+    assert isinstance(chica.store.tau, PackedSymmetric) and chica.tour_dtype == np.int16
+    assert chica.best_dist == densa.best_dist and chica.best_route == densa.best_route
+
+    # los checkpoints compactos guardan el mismo triángulo superior
+    reanudada = colony(instancia, init_node=0, n_ants=5, max_iter=10)
+    reanudada.load_state(str(tmp_path / 'estado.npz'))
+    assert np.array_equal(reanudada.store.tau[np.triu_indices(17)], chica.store.tau.data)
+
+
+def test_estudio_en_paralelo(tmp_path, monkeypatch):
+    """Revisa que con n_jobs=2 dos procesos completen todos los intentos sobre el mismo estudio sqlite.
+    """
+    import optuna
+    from .optim_hyper import _run_study
+
+    def objetivo(trial):
+        trial.set_user_attr('pid', os.getpid())
+        return trial.suggest_float('x', 0.0, 1.0)
+
+    monkeypatch.chdir(tmp_path)
+    mejor = _run_study(objetivo, trials=6, save=True, n_jobs=2)
+    study = optuna.load_study(study_name='optimize_aco', storage='sqlite:///best_hiper_params.db')
+    completos = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    assert len(completos) == 6
+    assert len({t.user_attrs['pid'] for t in completos} - {os.getpid()}) == 2
+    assert mejor.value == min(t.value for t in completos)
+
+
+def test_estudio_worker_fallido():
+    """Revisa que un worker del estudio de optuna que termina con error no pase desapercibido.
+    """
+    import pytest
+    from .optim_hyper import _run_study
+
+    def objetivo(trial):
+        raise ValueError('intento fallido')
+
+    with pytest.raises(RuntimeError, match='worker'):
+        _run_study(objetivo, trials=2, save=False, n_jobs=2)
+
+
+def test_hormigas_independientes():
+    """Revisa que hormigas creadas por separado recorran rutas distintas salvo que compartan semilla.
+    """
+    instancia = TSPInstance.from_graph(read_data('./datasets/gr17_d_city_distances.txt'))
+    A = np.ones((17, 17))
+
+    def recorrido(seed=None):
+        hormiga = ant(instancia, seed=seed)
+        hormiga.walk_over_graph(0, None, A)
+        return tuple(hormiga.route)
+
+    assert len({recorrido() for _ in range(4)}) > 1
+    assert recorrido(1959) == recorrido(1959)
+
+
+def test_warm_start_instancia_chica():
+    """Revisa el warm start greedy cuando no hay listas de candidatos (instancias chicas o n_neighbors >= n-1).
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    for grafo, kwargs in ((utils.rand_dist_matrix(8, seed=1950), {}),
+                          (G, {'n_neighbors': 16})):
+        colony_ = colony(grafo, init_node=0, n_ants=4, max_iter=0, warm_start='greedy', **kwargs)
+        n = colony_.instance.n
+        assert np.isfinite(colony_.best_dist)
+        assert colony_.best_route[0] == 0 and sorted(colony_.best_route[:-1]) == list(range(n))
+
+
+def test_poda_de_intentos(monkeypatch):
+    """Revisa que el callback por iteración de Objective reporte a optuna y que un intento podado termine como PRUNED.
+    """
+    import optuna
+    from . import optim_hyper
+
+    monkeypatch.setattr(optim_hyper, 'sample_params',
+                        lambda trial: dict(n_ants=4, max_iter=20, seed=1959))
+    objetivo = optim_hyper.Objective(read_data('./datasets/gr17_d_city_distances.txt'), 0)
+    # todo valor reportado está sobre el umbral: se poda en la primera iteración
+    study = optuna.create_study(pruner=optuna.pruners.ThresholdPruner(upper=1.0))
+    study.optimize(objetivo, n_trials=1)
+    intento, = study.trials
+    assert intento.state == optuna.trial.TrialState.PRUNED
+    assert list(intento.intermediate_values) == [1]
+
+    # sin poda el intento completa sus iteraciones
+    study = optuna.create_study(pruner=optim_hyper._make_pruner(None))
+    study.optimize(objetivo, n_trials=1)
+    intento, = study.trials
+    assert intento.state == optuna.trial.TrialState.COMPLETE
+    assert len(intento.intermediate_values) == 20
+
+
+def test_successive_halving(monkeypatch):
+    """Revisa los peldaños de optim_h_params_sh: candidatos por tamaño, corte por eta y reevaluación en la instancia completa.
+    """
+    import optuna
+    from . import optim_hyper
+
+    fuerte = dict(n_ants=20, max_iter=20, seed=1959)
+    candidatos = iter([fuerte] + [dict(n_ants=1, max_iter=1, seed=s) for s in range(8)])
+
+    def muestreo(trial):
+        # los candidatos se evalúan con FixedTrial de sus propios parámetros
+        if isinstance(trial, optuna.trial.FixedTrial):
+            return {k: trial.suggest_int(k, 0, 2**31) for k in fuerte}
+        return next(candidatos)
+
+    monkeypatch.setattr(optim_hyper, 'sample_params', muestreo)
+    G = np.loadtxt('./datasets/dantzig42_d.txt')
+    resultados = optim_hyper.optim_h_params_sh(G, 0, n_candidates=9, sizes=(10, 20, None), eta=3)
+    assert list(resultados) == [10, 20, 42]
+    assert [r['n_candidates'] for r in resultados.values()] == [9, 3, 1]
+    assert resultados[42]['params'] == fuerte
+    assert resultados[42]['value'] >= 699**2
+
+
+def test_busqueda_local_mejora_ruta():
+    """Revisa que 2-opt + Or-opt conserve la permutación y no empeore la ruta.
+    """
+    rng = np.random.default_rng(1950)
+    coords = rng.random((60, 2))
+    matriz = np.sqrt(((coords[:, None] - coords[None])**2).sum(-1))
+    ruta = np.append(rng.permutation(60), 0).astype(np.int32)
+    ruta[-1] = ruta[0]
+    mejor, dist = local_search(ruta, matriz, candidate_lists(matriz, 8))
+    assert mejor[0] == ruta[0] and mejor[-1] == ruta[0]
+    assert sorted(mejor[:-1]) == list(range(60))
+    assert dist < matriz[ruta[:-1], ruta[1:]].sum()
+    assert np.isclose(dist, matriz[mejor[:-1], mejor[1:]].sum())
+    # the result is a local optimum: a second pass finds no improving move
+    otra, dist2 = local_search(mejor, matriz, candidate_lists(matriz, 8))
+    assert np.array_equal(otra, mejor) and dist2 == dist
+
+
+def test_colony_con_busqueda_local():
+    """Con búsqueda local la colonia llega cerca del óptimo de gr17 (2085) en pocas iteraciones.
+    """
+    G = read_data('./datasets/gr17_d_city_distances.txt')
+    colonia = colony(G, init_node=0, n_ants=5, max_iter=5, local_search=True)
+    colonia.solve_tsp()
+    assert colonia.local_search == 'best' and colonia.best_dist < 2085 * 1.05
+    colony_mw = colony_multiw(G, init_node=0, n_ants=4, max_iter=2, n_workers=2, 
+                              local_search='all')
+    colony_mw.min_pool_work = 0
+    colony_mw.solve_tsp()
+    assert colony_mw.best_dist < 2085 * 1.1
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# secciones de datos de un archivo TSPLIB
+_SECTIONS = ('NODE_COORD_SECTION', 'EDGE_WEIGHT_SECTION', 'DISPLAY_DATA_SECTION',
+             'TOUR_SECTION', 'DEPOT_SECTION', 'DEMAND_SECTION', 'FIXED_EDGES_SECTION')
+
+
+def parse_tsplib(path):
+    """Lee un archivo TSPLIB en una sola pasada. El encabezado se procesa línea
+    por línea y las coordenadas (o pesos explícitos) se leen directamente a
+    arreglos de numpy, sin construir un grafo.
+
+    Args:
+        path (str): Ruta del archivo .tsp.
+
+    Returns:
+        (dic, np.array, np.array): Encabezado, identificadores de los nodos y
+        coordenadas (n, 2) o matriz de pesos (n, n) según la sección del archivo.
+    """
+    header = {}
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            key = line.split(':')[0].strip().upper()
+            if key in _SECTIONS:
+                dimension = int(header['DIMENSION'])
+                if key == 'NODE_COORD_SECTION':
+                    data = np.loadtxt(f, max_rows=dimension, ndmin=2)
+                    return header, data[:, 0].astype(np.int64), data[:, 1:3]
+                if key == 'EDGE_WEIGHT_SECTION':
+                    weights = _explicit_matrix(_read_numbers(f), dimension,
+                                               header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'))
+                    return header, np.arange(dimension), weights
+                break
+            if key == 'EOF':
+                break
+            if ':' in line:
+                name, value = line.split(':', 1)
+                header[name.strip().upper()] = value.strip()
+    raise ValueError(f'{path} no tiene NODE_COORD_SECTION ni EDGE_WEIGHT_SECTION')
+
+
+def load_tsplib(path, cache=True):
+    """Carga un archivo TSPLIB usando un caché binario junto al archivo
+    (<path>.npy con los datos y <path>.meta.json con el encabezado). El caché se
+    abre con memory-map y se invalida si cambia el tamaño o el hash del
+    archivo; el hash solo se recalcula cuando cambia la fecha de modificación.
+
+    Args:
+        path (str): Ruta del archivo .tsp.
+        cache (bool, optional): Usa (y escribe) el caché. Default es True.
+
+    Returns:
+        (dic, np.array, np.array): Encabezado, identificadores de los nodos y
+        coordenadas o matriz de pesos.
+    """
+    if not cache:
+        return parse_tsplib(path)
+
+    data_path, meta_path = path + '.npy', path + '.meta.json'
+    stat = os.stat(path)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        valid = meta['size'] == stat.st_size
+        if valid and meta['mtime'] != stat.st_mtime:
+            valid = meta['sha1'] == _sha1(path)
+            if valid:
+                meta['mtime'] = stat.st_mtime
+                _write_json(meta_path, meta)
+        if valid:
+            data = np.load(data_path, mmap_mode='r')
+            if 'nodes' in meta:
+                nodes = np.asarray(meta['nodes'])
+            else:
+                nodes = np.arange(meta['first_id'], meta['first_id'] + data.shape[0])
+            return meta['header'], nodes, data
+    except (OSError, ValueError, KeyError):
+        pass
+
+    header, nodes, data = parse_tsplib(path)
+    meta = {'header': header, 'size': stat.st_size, 'mtime': stat.st_mtime,
+            'sha1': _sha1(path)}
+    first_id = int(nodes[0]) if len(nodes) else 0
+    if np.array_equal(nodes, np.arange(first_id, first_id + len(nodes))):
+        meta['first_id'] = first_id
+    else:
+        meta['nodes'] = nodes.tolist()
+    try:
+        _write_npy(data_path, data)
+        _write_json(meta_path, meta)
+    except OSError:
+        pass
+    return header, nodes, data
+
+
+def _read_numbers(f):
+    """Lee números hasta la siguiente sección o EOF. No está disponible para
+    los usuarios.
+    """
+    chunks = []
+    for line in f:
+        token = line.strip()
+        if token and (token[0].isalpha() or token == '-1'):
+            break
+        chunks.append(token)
+    return np.array(' '.join(chunks).split(), dtype=np.float64)
+
+
+def _explicit_matrix(values, n, fmt):
+    """Construye la matriz de pesos de una sección EDGE_WEIGHT_SECTION. No está
+    disponible para los usuarios.
+    """
+    fmt = fmt.upper()
+    if fmt == 'FULL_MATRIX':
+        return values[:n*n].reshape(n, n)
+    mat = np.zeros((n, n))
+    if fmt in ('LOWER_DIAG_ROW', 'UPPER_DIAG_COL'):
+        idx = np.tril_indices(n)
+    elif fmt in ('UPPER_DIAG_ROW', 'LOWER_DIAG_COL'):
+        idx = np.triu_indices(n)
+    elif fmt in ('LOWER_ROW', 'UPPER_COL'):
+        idx = np.tril_indices(n, -1)
+    elif fmt in ('UPPER_ROW', 'LOWER_COL'):
+        idx = np.triu_indices(n, 1)
+    else:
+        raise ValueError(f'EDGE_WEIGHT_FORMAT no soportado: {fmt}')
+    mat[idx] = values[:len(idx[0])]
+    mat.T[idx] = values[:len(idx[0])]
+    return mat
+
+
+def _sha1(path):
+    """Hash SHA-1 del contenido de un archivo. No está disponible para los
+    usuarios.
+    """
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json(path, obj):
+    """Escribe un json de forma atómica. No está disponible para los usuarios.
+    """
+    tmp = _tmp_path(path)
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(obj, f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _write_npy(path, data):
+    """Escribe un .npy de forma atómica, para que otro proceso nunca mapee un
+    arreglo a medio escribir. No está disponible para los usuarios.
+    """
+    tmp = _tmp_path(path)
+    try:
+        with open(tmp, 'wb') as f:
+            np.save(f, data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _tmp_path(path):
+    """Archivo temporal en el mismo directorio que path, único por proceso
+    para que dos escritores simultáneos no se pisen. No está disponible para
+    los usuarios.
+    """
+    return f'{path}.{os.getpid()}.tmp'
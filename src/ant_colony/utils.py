@@ -1,14 +1,10 @@
-import folium
-import matplotlib.pyplot as plt
-import networkx as nx
 import numpy as np
-import pandas as pd
 import random
-import tsplib95
 
-from folium import plugins
 from multiprocessing import cpu_count
-from scipy.spatial import distance_matrix
+
+# folium, matplotlib, networkx, pandas y scipy se importan dentro de las
+# funciones que los usan: importar el paquete no carga esas librerías
 
 ###
 def plot_nodes_map(df, save=False, save_as='path'):
@@ -22,6 +18,9 @@ def plot_nodes_map(df, save=False, save_as='path'):
     Returns:
         [folium map]: Mapa con los nodos de cada ubicación.
     """
+    import folium
+    from folium import plugins
+
     df_coord = df.copy()
 
     df_coord.reset_index(inplace=True, drop=True)
@@ -60,6 +59,9 @@ def plot_rout_map(df, route, path_type='ants', nodes=True, save=False, save_as='
     Returns:
         [folium map]: Mapa con los nodos conectados por la ruta provista.
     """
+    import folium
+    from folium import plugins
+
     df_coord = df.copy()
     sorter = route[:-1]
 
@@ -170,6 +172,8 @@ def create_dic_dist_from_graph(G):
     Returns:
         (dic): Diccionario de distancias de los nodos
     """
+    import networkx as nx
+
     nodos = list(G.nodes)
     G_num = nx.to_numpy_matrix(G)
     lenghts = {}
@@ -178,7 +182,43 @@ def create_dic_dist_from_graph(G):
         for neighbor in nodos:
             lenghts[node][neighbor] = z[0, neighbor]
 
-    return lenghts  
+    return lenghts
+
+def graph_to_mat(G):
+    """Crea la matriz de distancias y la matriz de adyacencia de un grafo. Los
+    índices de las matrices siguen el orden de G.nodes.
+
+    Args:
+        G (networkx graph): Grafo con relaciones asociadas entre nodos
+
+    Returns:
+        (np.array, np.array): Matriz de distancias y matriz booleana de
+        trayectorias existentes.
+    """
+    import networkx as nx
+
+    dist = nx.to_numpy_array(G, weight='weight', nonedge=0.0)
+    adj = nx.to_numpy_array(G, weight=None, nonedge=0.0) > 0
+    return dist, adj
+
+def dic_to_mat(lenghts):
+    """Convierte un diccionario de distancias entre nodos en su versión
+    numérica. Si recibe una matriz, la regresa como arreglo de numpy.
+
+    Args:
+        lenghts (dic or np.array): Diccionario (o matriz) de distancias
+
+    Returns:
+        (np.array): Matriz de distancias
+    """
+    if not isinstance(lenghts, dict):
+        return np.asarray(lenghts, dtype=np.float64)
+    n = len(lenghts)
+    dist = np.zeros((n, n))
+    for node, z in lenghts.items():
+        for neighbor, y in z.items():
+            dist[node, neighbor] = y
+    return dist
 
 def init_ferom(G, init_lev=1.0):
     """Inicialización de diccionario con nivel de feromonas de los nodos.
@@ -273,64 +313,61 @@ def read_data(path):
     """
     ext = path[-3:]
     if ext == 'txt':
+        import networkx as nx
+
         data = np.loadtxt(path)
         return nx.from_numpy_matrix(data)
     elif ext == 'tsp':
-        data = tsplib95.load(path)
-        return data.get_graph() 
+        from .instance import TSPInstance
+        return TSPInstance.from_tsplib(path).to_graph()
 
-def read_coord_data(path, n_cities, seed=1999, coord_df=False):
+def read_coord_data(path, n_cities, seed=1999, coord_df=False, dense=True):
     """
     Basado en la solución propuesta en el siguiente repositorio: https://github.com/DiegoVicen/som-tsp
     Convierte en grafo datos de matrices de coordenadas leídas desde un archivo .tsp.
+    Las coordenadas se leen con el parser de ant_colony.tsplib, que guarda un
+    caché binario junto al archivo para las siguientes lecturas.
 
     Args:
         path (str): Ruta del archivo.
         n_cities (int): número de ciudades a samplear.
         seed (int): seed para el sampleo.
         coord_df (bool): Si se quiere retornar df con coordenadas.
+        dense (bool, optional): Si es False se regresa una TSPInstance con
+        distancias implícitas (CoordDistance) en lugar del grafo, sin construir
+        la matriz de n x n. Default es True.
 
     Returns:
-        (graph networkx or df): Grafo asociado a la matriz de distancias ó df con coordenadas. 
+        (graph networkx, TSPInstance or df): Grafo asociado a la matriz de
+        distancias, instancia con distancias implícitas ó df con coordenadas. 
     """
-    
-    with open(path) as f:
-        node_coord_start = None
-        dimension = None
-        lines = f.readlines()
-    
-    # Obtain the information about the .tsp
-    i = 0
-    while not dimension or not node_coord_start:
-        line = lines[i]
-        if line.startswith('DIMENSION :'):
-            dimension = int(line.split()[-1])
-        if line.startswith('NODE_COORD_SECTION'):
-            node_coord_start = i
-        i = i+1
-    
-    cities_df = pd.read_csv(
-            path,
-            skiprows=node_coord_start + 1,
-            sep=' ',
-            names=['city', 'lat', 'lon'],
-            dtype={'city': str, 'lat': np.float64, 'lon': np.float64},
-            header=None,
-            nrows=dimension
-        )
-    # Clean x, y coordinates
-    cities_df['lat'] = cities_df['lat'].div(1000)
-    cities_df['lon'] = cities_df['lon'].div(1000)
+    from .tsplib import load_tsplib
+
+    _, nodes, coords = load_tsplib(path)
+    dimension = coords.shape[0]
 
     print('Problem with {} cities. Selected {}.'.format(dimension, n_cities))
     
-    sample_df = cities_df.sample(n_cities, random_state=seed)
+    # mismo muestreo que DataFrame.sample(n_cities, random_state=seed)
+    sample = np.random.RandomState(seed).choice(dimension, n_cities, replace=False)
+    # Clean x, y coordinates
+    array_coord = coords[sample] / 1000
 
     if coord_df:
-        return sample_df
+        import pandas as pd
+
+        return pd.DataFrame({'city': nodes[sample].astype(str),
+                             'lat': array_coord[:, 0],
+                             'lon': array_coord[:, 1]}, index=sample)
+
+    if not dense:
+        from .instance import TSPInstance
+
+        return TSPInstance.from_coords(array_coord, dense=False)
+
+    import networkx as nx
+    from scipy.spatial import distance_matrix
 
-    array_coord = sample_df[['lat','lon']].to_numpy()
-    
     d_mat = distance_matrix(array_coord, array_coord)
     G = nx.from_numpy_matrix(d_mat)
     
@@ -367,6 +404,8 @@ def rand_dist_matrix(n_points, graph=True, scale_factor=1, round_factor=4,seed=1
         dist_mat = (dist_mat*scale_factor).round(round_factor)
     # Matriz de distancias
     if graph:
+        import networkx as nx
+
         G = nx.from_numpy_matrix(dist_mat) 
     else:
         G = dist_mat
@@ -386,6 +425,9 @@ def plot_graph(G, m_plot, seed=19511959):
         nodos en la 
             visualización. Default es 19511959.
     """
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
     pos = nx.fruchterman_reingold_layout(G, center=(0,0), seed=seed) 
     colors = range(20)
     if m_plot=='coordinate':
@@ -415,6 +457,9 @@ def graph_optim_path(G, route, dist, plt_size=(15, 6)):
         plt_size (tpl): Tamaño de la gráfica en matplotlib.
 
     """
+    import matplotlib.pyplot as plt
+    import networkx as nx
+
 
     seed=19511959
     pos = nx.fruchterman_reingold_layout(G, center=(0,0), seed=seed) 
@@ -0,0 +1,135 @@
+import numpy as np
+from multiprocessing import shared_memory
+from .construction import build_tours
+from .distance import PackedSymmetric
+from .streams import uniform_steps
+from .local_search import improve_tours
+
+# arreglos compartidos mapeados por el worker en su inicialización
+_shared = {}
+# distancias implícitas (CoordDistance) del problema, si no se comparte 'dist'
+_oracle = None
+
+
+class SharedArray(object):
+    """Arreglo de numpy respaldado por un bloque de multiprocessing.shared_memory.
+    El proceso que lo crea es dueño del bloque y lo libera al cerrarlo; los
+    workers lo mapean a partir de su descripción (nombre, forma y tipo).
+
+    Args:
+        shape (tuple): Forma del arreglo.
+        dtype (np.dtype): Tipo de dato del arreglo.
+        name (str, optional): Nombre de un bloque existente. Default es None
+        (se crea un bloque nuevo).
+    """
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            size = max(int(np.prod(self.shape)) * self.dtype.itemsize, 1)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @classmethod
+    def from_array(cls, arr):
+        """Crea un bloque compartido con una copia de arr.
+
+        Args:
+            arr (np.array): Arreglo a compartir.
+
+        Returns:
+            (SharedArray): Arreglo compartido.
+        """
+        shared = cls(arr.shape, arr.dtype)
+        shared.array[...] = arr
+        return shared
+
+    @property
+    def spec(self):
+        """Descripción del bloque para mapearlo desde otro proceso.
+        """
+        return (self.shm.name, self.shape, self.dtype.str)
+
+    @classmethod
+    def attach(cls, spec):
+        """Mapea un bloque existente a partir de su descripción.
+
+        Args:
+            spec (tuple): Nombre, forma y tipo del bloque.
+
+        Returns:
+            (SharedArray): Arreglo compartido.
+        """
+        name, shape, dtype = spec
+        return cls(shape, dtype, name=name)
+
+    def close(self):
+        """Libera el mapeo del bloque y, si el proceso es dueño, el bloque.
+        """
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def init_worker(specs, oracle=None):
+    """Inicializador de los workers del pool: mapea una sola vez los arreglos
+    compartidos del problema.
+
+    Args:
+        specs (dic): Descripción de cada arreglo compartido por nombre.
+        oracle (CoordDistance, optional): Distancias implícitas, usadas en lugar
+        del arreglo compartido 'dist'. Default es None.
+    """
+    global _oracle
+    _oracle = oracle
+    _shared.clear()
+    for key, spec in specs.items():
+        _shared[key] = SharedArray.attach(spec)
+
+
+def _matrix(key):
+    """Matriz compartida; los arreglos de una dimensión son triángulos
+    superiores empacados (instancias compactas). No está disponible para los
+    usuarios.
+    """
+    arr = _shared[key].array
+    return PackedSymmetric(arr) if arr.ndim == 1 else arr
+
+
+def walk_task(lo, hi, init_node, seeds, local_search=None, total=None):
+    """Recorridos de las hormigas lo:hi de la colonia sobre los arreglos
+    compartidos. Los recorridos y distancias se escriben en los buffers
+    compartidos de salida.
+
+    Args:
+        lo (int): Primera hormiga asignada al worker.
+        hi (int): Última hormiga (exclusiva) asignada al worker.
+        init_node (int): Nodo inicial del recorrido.
+        seeds (lst): Semillas de los lotes de hormigas asignados al worker
+        (ver streams.batch_seeds).
+        local_search (str, optional): Modo de búsqueda local a aplicar a los
+        recorridos del lote. Default es None.
+        total (int, optional): Número de hormigas de la colonia. Default es
+        None (hi).
+
+    Returns:
+        (int): Número de hormigas procesadas.
+    """
+    cand = _shared.get('candidates')
+    dist = _matrix('dist') if _oracle is None else _oracle
+    A = _matrix('A')
+    tours, lengths = build_tours(A, dist, init_node, hi - lo,
+                                 candidates=None if cand is None else cand.array,
+                                 u=uniform_steps(seeds, hi - lo, A.shape[0] - 1,
+                                                 lo=lo, total=total),
+                                 dtype=_shared['tours'].array.dtype)
+    if local_search:
+        improve_tours(tours, lengths, dist,
+                      _shared['ls_candidates'].array, local_search)
+    _shared['tours'].array[lo:hi] = tours
+    _shared['lengths'].array[lo:hi] = lengths
+    return hi - lo
@@ -19,5 +19,6 @@ setup(name="ant_colony",
                           "scipy",
                           "tsplib95"
                           ],
+      entry_points={"console_scripts": ["aco-tsp=ant_colony.cli:main"]},
       )
 